@@ -0,0 +1,5 @@
+"""
+Performance benchmarks for the zombie shooter environment and Q-learning trainer.
+
+Each module can be run on its own from the repository root, e.g. python -m benchmarks.collisions
+"""
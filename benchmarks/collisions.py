@@ -0,0 +1,107 @@
+"""
+Benchmark of the bullet-zombie collision pass as the number of entities on screen grows.
+
+Compares the original nested loop (every bullet against every zombie with list.remove) with
+ZombieShooterEnv.check_bullet_hits() (Python loops over a few entities, array-based pair tests for more), and reports
+the cost of a full step() at the same densities.
+
+Run With:
+    python -m benchmarks.collisions
+"""
+
+import random
+import time
+import pygame
+from zombie_shooter_with_rl import (
+    ZombieShooterEnv,
+    WIDTH,
+    HEIGHT,
+    MAX_BULLETS,
+    MAX_ZOMBIES,
+)
+
+# Up to the pools' capacity, as spawns into a full pool are skipped
+ENTITY_COUNTS = [10, 25, 50, 100, 200, min(MAX_ZOMBIES, MAX_BULLETS)]
+REPEATS = 200
+
+
+def nested_loop_hits(zombies, bullets):
+    """The original O(bullets * zombies) collision pass over pygame.Rect lists, kept as the baseline."""
+    kills = 0
+    for bullet, _ in bullets[:]:
+        for zombie in zombies[:]:
+            if bullet.colliderect(zombie):
+                bullets.remove((bullet, _))
+                zombies.remove(zombie)
+                kills += 1
+                break
+    return kills
+
+
+def populate(env, rng, count):
+    """
+    Fills env with `count` zombies and `count` bullets at random positions away from the player.
+
+    Returns the same entities as the (zombies, bullets) pygame.Rect lists used by nested_loop_hits().
+    """
+    env.reset()
+    zombies = []
+    bullets = []
+    for _ in range(count):
+        x, y = rng.randint(0, WIDTH - 40), rng.randint(0, 150)
+        env.zombies.spawn(x, y)
+        zombies.append(pygame.Rect(x, y, 40, 40))
+        x, y = rng.randint(0, WIDTH - 5), rng.randint(0, HEIGHT - 10)
+        env.bullets.spawn(x, y, 0, -1)
+        bullets.append((pygame.Rect(x, y, 5, 10), (0, -1)))
+    return zombies, bullets
+
+
+def time_per_call(env, rng, count, func):
+    """Returns the mean time in microseconds of func(zombies, bullets) on freshly populated environments."""
+    total = 0.0
+    for _ in range(REPEATS):
+        zombies, bullets = populate(env, rng, count)
+        start = time.perf_counter()
+        func(zombies, bullets)
+        total += time.perf_counter() - start
+    return total / REPEATS * 1e6
+
+
+def run():
+    """Returns one result row per entity count."""
+    env = ZombieShooterEnv()
+    results = []
+    for count in ENTITY_COUNTS:
+        results.append(
+            {
+                "entities": count,
+                "nested_loop_us": time_per_call(
+                    env, random.Random(count), count, nested_loop_hits
+                ),
+                "indexed_us": time_per_call(
+                    env,
+                    random.Random(count),
+                    count,
+                    lambda zombies, bullets: env.check_bullet_hits(),
+                ),
+                "step_us": time_per_call(
+                    env,
+                    random.Random(count),
+                    count,
+                    lambda zombies, bullets: env.step(0),
+                ),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(
+        f"{'zombies+bullets':>16} {'nested loop':>12} {'indexed':>10} {'full step':>10}"
+    )
+    for row in run():
+        print(
+            f"{row['entities']:>16} {row['nested_loop_us']:>10.1f}us "
+            f"{row['indexed_us']:>8.1f}us {row['step_us']:>8.1f}us"
+        )
@@ -0,0 +1,87 @@
+"""
+Benchmark of the experience replay buffers (replay.py) at large capacities.
+
+For a full ReplayBuffer and PrioritizedReplayBuffer of each capacity it reports the cost of storing one transition
+with add(), of storing a batch with add_batch() (per transition), of drawing a BATCH_SIZE minibatch with sample() and
+of updating the priorities of a minibatch with update_priorities().
+
+Run With:
+    python -m benchmarks.replay
+"""
+
+import time
+import numpy as np
+from replay import PrioritizedReplayBuffer, ReplayBuffer
+from state_encoding import NUM_STATES
+
+CAPACITIES = [10**6, 10**7]
+BATCH_SIZE = 64
+INSERT_BATCH_SIZE = 1024
+REPEATS = 2000
+
+
+def random_transitions(rng, count):
+    """Returns `count` random transitions as the (N,) arrays taken by add_batch()."""
+    return (
+        rng.integers(NUM_STATES, size=count),
+        rng.integers(9, size=count),
+        rng.standard_normal(count),
+        rng.integers(NUM_STATES, size=count),
+        rng.random(count) < 0.01,
+    )
+
+
+def time_per_call(func, repeats=REPEATS):
+    """Returns the mean time in microseconds of func()."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def bench_buffer(buffer, rng):
+    """Fills buffer and returns the costs of its operations in microseconds."""
+    buffer.add_batch(*random_transitions(rng, buffer.capacity))
+    batch = random_transitions(rng, INSERT_BATCH_SIZE)
+    transition = [column[0] for column in batch]
+    result = {
+        "add_us": time_per_call(lambda: buffer.add(*transition)),
+        "add_batch_us": time_per_call(lambda: buffer.add_batch(*batch), REPEATS // 10)
+        / INSERT_BATCH_SIZE,
+        "sample_us": time_per_call(lambda: buffer.sample(BATCH_SIZE)),
+    }
+    if isinstance(buffer, PrioritizedReplayBuffer):
+        slots = buffer.sample(BATCH_SIZE)[0]
+        td_errors = rng.standard_normal(BATCH_SIZE)
+        result["update_priorities_us"] = time_per_call(
+            lambda: buffer.update_priorities(slots, td_errors)
+        )
+    return result
+
+
+def run():
+    """Returns one result row per capacity and buffer type."""
+    results = []
+    for capacity in CAPACITIES:
+        for buffer_class in (ReplayBuffer, PrioritizedReplayBuffer):
+            rng = np.random.default_rng(capacity)
+            buffer = buffer_class(capacity, seed=capacity)
+            row = {"capacity": capacity, "buffer": buffer_class.__name__}
+            row.update(bench_buffer(buffer, rng))
+            results.append(row)
+            del buffer  # Free the arrays before the next buffer is allocated
+    return results
+
+
+if __name__ == "__main__":
+    print(
+        f"{'capacity':>10} {'buffer':>24} {'add':>9} {'add_batch':>10} "
+        f"{f'sample x{BATCH_SIZE}':>11} {'priorities':>11}"
+    )
+    for row in run():
+        priorities = row.get("update_priorities_us")
+        print(
+            f"{row['capacity']:>10} {row['buffer']:>24} {row['add_us']:>7.2f}us "
+            f"{row['add_batch_us']:>8.3f}us {row['sample_us']:>9.1f}us "
+            + (f"{priorities:>9.1f}us" if priorities is not None else f"{'-':>11}")
+        )
@@ -0,0 +1,123 @@
+"""
+Benchmark of the nearest-zombie part of get_state() as the number of zombies on screen grows.
+
+Compares the original Python min() over the zombies followed by the atan2 if/elif bucketing with the vectorized
+nearest-zombie search used by ZombieShooterEnv.get_state() (with the "atan2" and "octant" encoders), and with the
+batched get_states() over BATCH_SIZE environments (the whole state, reported per environment).
+
+Run With:
+    python -m benchmarks.state
+"""
+
+import math
+import random
+import time
+import pygame
+from state_encoding import nearest_direction
+from zombie_shooter_with_rl import ZombieShooterEnv, get_states, WIDTH, HEIGHT, MAX_ZOMBIES
+
+# Up to the zombie pool's capacity, as spawns into a full pool are skipped
+ZOMBIE_COUNTS = [0, 1, 10, 50, 100, 200, MAX_ZOMBIES]
+BATCH_SIZE = 64
+REPEATS = 2000
+
+
+def min_loop_direction(player, zombies):
+    """The original nearest-zombie direction of get_state() over a pygame.Rect list, kept as the baseline."""
+    if not zombies:
+        return 0
+    closest = min(
+        zombies,
+        key=lambda z: math.hypot(
+            z.centerx - player.centerx, z.centery - player.centery
+        ),
+    )
+    dx = closest.centerx - player.centerx
+    dy = closest.centery - player.centery
+    angle = math.degrees(math.atan2(-dy, dx))
+    if -22.5 <= angle < 22.5:
+        return 3
+    elif 22.5 <= angle < 67.5:
+        return 2
+    elif 67.5 <= angle < 112.5:
+        return 1
+    elif 112.5 <= angle < 157.5:
+        return 8
+    elif angle >= 157.5 or angle < -157.5:
+        return 7
+    elif -157.5 <= angle < -112.5:
+        return 6
+    elif -112.5 <= angle < -67.5:
+        return 5
+    else:
+        return 4
+
+
+def vectorized_direction(env, encoder="atan2"):
+    """The nearest-zombie direction as ZombieShooterEnv.get_state() computes it."""
+    zombies = env.zombies
+    if not zombies.count:
+        return 0
+    n = zombies.high
+    return nearest_direction(
+        zombies.x[:n] - env.player.x, zombies.y[:n] - env.player.y, encoder=encoder
+    )
+
+
+def populate(env, rng, count):
+    """
+    Fills env with `count` zombies at random positions.
+
+    Returns the same zombies as the pygame.Rect list used by min_loop_direction().
+    """
+    env.reset()
+    zombies = []
+    for _ in range(count):
+        x, y = rng.randint(0, WIDTH - 40), rng.randint(0, HEIGHT - 40)
+        env.zombies.spawn(x, y)
+        zombies.append(pygame.Rect(x, y, 40, 40))
+    return zombies
+
+
+def time_per_call(func, repeats=REPEATS):
+    """Returns the mean time in microseconds of func()."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def run():
+    """Returns one result row per zombie count."""
+    results = []
+    for count in ZOMBIE_COUNTS:
+        rng = random.Random(count)
+        envs = [ZombieShooterEnv() for _ in range(BATCH_SIZE)]
+        zombies = [populate(env, rng, count) for env in envs][0]
+        env = envs[0]
+        results.append(
+            {
+                "zombies": count,
+                "min_loop_us": time_per_call(
+                    lambda: min_loop_direction(env.player, zombies)
+                ),
+                "vectorized_us": time_per_call(lambda: vectorized_direction(env)),
+                "octant_us": time_per_call(lambda: vectorized_direction(env, "octant")),
+                "batched_us": time_per_call(
+                    lambda: get_states(envs), REPEATS // BATCH_SIZE
+                )
+                / BATCH_SIZE,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(
+        f"{'zombies':>8} {'min() loop':>11} {'vectorized':>10} {'octant':>8} {f'batched x{BATCH_SIZE}':>12}"
+    )
+    for row in run():
+        print(
+            f"{row['zombies']:>8} {row['min_loop_us']:>9.1f}us "
+            f"{row['vectorized_us']:>8.1f}us {row['octant_us']:>6.1f}us {row['batched_us']:>10.1f}us"
+        )
@@ -0,0 +1,376 @@
+"""
+Reproducible performance suite for the environment and the Q-learning trainer.
+
+Every measurement uses fixed seeds and scripted action sequences, so two runs differ only by the speed of the code and
+the machine. The suite reports:
+    - step: raw ZombieShooterEnv.step() throughput over a scripted random-action run
+    - density: step() throughput with the game held in each phase and the zombie pool kept at that phase's crowding
+      (the zombies it spawns in DENSITY_SECONDS), so Phase 1 and Phase 3 differ by more than the spawn timer
+    - get_state: cost of ZombieShooterEnv.get_state() on a crowded frame (Phase 3 crowding)
+    - observations: cost of a get_state() tuple against rendered pixel observations (pixel_observations.py)
+    - snapshot: cost of ZombieShooterEnv.clone_state() and restore_state() on a crowded frame
+    - q_update: cost of choose_action() and update_q_table() from zombie_shooter_ql.py (tuple and flat states), of their
+      batched forms and of a compiled greedy-policy lookup (policy.py)
+    - render: cost of drawing one frame with the Renderer, with dirty-rectangle updates and with full redraws (to a
+      dummy display when no video driver is set)
+    - training: end-to-end episodes per hour of the zombie_shooter_ql.py training loop, with its Q-table layout
+
+Results are written as JSON together with the commit and library versions, so runs can be compared across commits
+and machines.
+
+Run With:
+    python -m benchmarks.suite [--output results.json] [--quick]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import numpy as np
+import pygame
+import zombie_shooter_ql as ql
+from pixel_observations import PixelObservations
+from policy import greedy_policy
+from replay import PrioritizedReplayBuffer, ReplayBuffer
+from state_encoding import NUM_STATES, flat_states
+from zombie_shooter_with_rl import ZombieShooterEnv, Renderer, PHASES
+
+SEED = 1234
+REPEATS = 5  # Timed runs per measurement; the best one is reported
+STEPS = 20_000
+DENSITY_WARMUP_STEPS = 600  # Steps to let zombies pile up before timing a phase
+DENSITY_SECONDS = 30  # A held phase keeps as many zombies on screen as it spawns in this many seconds
+TRAINING_EPISODES = 20
+CALLS = 20_000
+Q_BATCH_SIZE = 1024  # Transitions per call of the batched Q-learning functions
+# Pixel observation formats timed against the state tuple
+OBSERVATION_FORMATS = {
+    "rgb": {},
+    "gray": {"grayscale": True},
+    "gray_downsample4_stack4": {"grayscale": True, "downsample": 4, "stack": 4},
+}
+
+
+def scripted_actions(count, seed=SEED):
+    """Returns a fixed pseudo-random sequence of `count` actions."""
+    rng = random.Random(seed)
+    return [rng.randint(0, ql.action_space_size - 1) for _ in range(count)]
+
+
+def best_rate(run, repeats):
+    """Calls run() `repeats` times and returns the highest of the (count, seconds) rates it returns."""
+    best = 0.0
+    for _ in range(repeats):
+        count, seconds = run()
+        best = max(best, count / seconds)
+    return best
+
+
+def phase_zombies(phase):
+    """Returns the number of zombies a held `phase` keeps on screen."""
+    return DENSITY_SECONDS * 1000 // PHASES[phase]["spawn_delay"]
+
+
+def hold_phase(env, phase):
+    """
+    Puts env into `phase` and keeps it there with phase_zombies(phase) zombies on screen.
+
+    Zombies that reach the player are removed without taking health, so the game never ends and they do not pile
+    up on the player, where every new bullet would hit one as it spawns. Every spawn then tops the zombie pool back
+    up at random edges, so the crowding stays spread over the arena and does not depend on how well the scripted
+    actions shoot.
+    """
+    env.reset()
+    env.phase = phase
+    env.phase_start = float("inf")  # The phase timer never runs out
+    zombies = phase_zombies(phase)
+
+    def remove_touching():
+        player = env.player
+        env.zombies.kill(
+            env.zombies.overlapping(player.x, player.y, player.w, player.h)
+        )
+        return 0
+
+    env.check_player_hits = remove_touching
+    spawn_zombie = type(env).spawn_zombie.__get__(env)
+
+    def top_up():
+        while len(env.zombies) < zombies:
+            env.last_spawn = -float("inf")
+            spawn_zombie()
+
+    env.spawn_zombie = top_up
+    top_up()
+
+
+def bench_step(repeats):
+    """Steps per second of step() on scripted random actions."""
+    actions = scripted_actions(STEPS)
+
+    def run():
+        env = ZombieShooterEnv(seed=SEED)
+        start = time.perf_counter()
+        for action in actions:
+            env.step(action)
+        return len(actions), time.perf_counter() - start
+
+    return {"steps_per_sec": best_rate(run, repeats)}
+
+
+def held_phase_env(phase, seed=SEED):
+    """Returns an environment held in `phase` after DENSITY_WARMUP_STEPS scripted steps."""
+    env = ZombieShooterEnv(seed=seed)
+    hold_phase(env, phase)
+    for action in scripted_actions(DENSITY_WARMUP_STEPS, seed + 1):
+        env.step(action)
+    return env
+
+
+def bench_density(repeats):
+    """Steps per second and average entity counts of step() held in each phase."""
+    actions = scripted_actions(STEPS // 4)
+    results = {}
+    for phase in range(len(PHASES)):
+
+        def run():
+            env = held_phase_env(phase)
+            start = time.perf_counter()
+            for action in actions:
+                env.step(action)
+            return len(actions), time.perf_counter() - start
+
+        # Replay the same deterministic run untimed to count the entities
+        env = held_phase_env(phase)
+        zombies = bullets = 0
+        for action in actions:
+            env.step(action)
+            zombies += len(env.zombies)
+            bullets += len(env.bullets)
+
+        results[PHASES[phase]["name"]] = {
+            "steps_per_sec": best_rate(run, repeats),
+            "mean_zombies": zombies / len(actions),
+            "mean_bullets": bullets / len(actions),
+        }
+    return results
+
+
+def crowded_env(seed=SEED):
+    """Returns an environment held in the last phase, the most crowded one."""
+    return held_phase_env(len(PHASES) - 1, seed)
+
+
+def per_call_us(func, repeats, calls=CALLS):
+    """Best mean time of func() in microseconds."""
+
+    def run():
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        return calls, time.perf_counter() - start
+
+    return 1e6 / best_rate(run, repeats)
+
+
+def bench_get_state(repeats):
+    """Cost of get_state() on a crowded frame."""
+    env = crowded_env()
+    return {
+        "us_per_call": per_call_us(env.get_state, repeats),
+        "zombies": len(env.zombies),
+    }
+
+
+def bench_observations(repeats):
+    """Cost of one observation of a crowded frame: the state tuple and pixel frames in a few formats."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    env = crowded_env()
+    results = {"state_tuple_us": per_call_us(env.get_state, repeats)}
+    for name, options in OBSERVATION_FORMATS.items():
+        observations = PixelObservations(env, **options)
+        observations.reset()
+        results[f"{name}_us"] = per_call_us(observations.observe, repeats, calls=500)
+    return results
+
+
+def bench_snapshot(repeats):
+    """Cost of clone_state() and restore_state() on a crowded frame."""
+    env = crowded_env()
+    snapshot = env.clone_state()
+    return {
+        "clone_state_us": per_call_us(env.clone_state, repeats),
+        "restore_state_us": per_call_us(lambda: env.restore_state(snapshot), repeats),
+        "zombies": len(env.zombies),
+    }
+
+
+def bench_q_update(repeats):
+    """
+    Cost of one epsilon-greedy action choice and one Q-table update, one at a time and
+    per transition of a Q_BATCH_SIZE batch.
+    """
+    rng = np.random.default_rng(SEED)
+    q_table = rng.standard_normal(ql.state_space_size + (ql.action_space_size,))
+    states = np.stack(
+        [rng.integers(size, size=Q_BATCH_SIZE) for size in ql.state_space_size], axis=1
+    )
+    next_states = np.roll(states, 1, axis=0)
+    actions = rng.integers(ql.action_space_size, size=Q_BATCH_SIZE)
+    rewards = rng.standard_normal(Q_BATCH_SIZE)
+    state = tuple(states[0].tolist())
+    next_state = tuple(states[1].tolist())
+    flat_q_table = q_table.reshape(NUM_STATES, ql.action_space_size)
+    flat_state, flat_next_state = flat_states(states[:2]).tolist()
+    policy = greedy_policy(q_table).tobytes()
+    calls = CALLS // Q_BATCH_SIZE
+    return {
+        "choose_action_us": per_call_us(
+            lambda: ql.choose_action(q_table, state, 0.1, rng), repeats
+        ),
+        "update_q_table_us": per_call_us(
+            lambda: ql.update_q_table(q_table, state, 3, 0.1, next_state), repeats
+        ),
+        "update_q_table_flat_us": per_call_us(
+            lambda: ql.update_q_table(
+                flat_q_table, flat_state, 3, 0.1, flat_next_state
+            ),
+            repeats,
+        ),
+        "policy_lookup_us": per_call_us(lambda: policy[flat_state], repeats),
+        "batch_size": Q_BATCH_SIZE,
+        "choose_actions_us_per_transition": per_call_us(
+            lambda: ql.choose_actions(q_table, states, 0.1, rng), repeats, calls
+        )
+        / Q_BATCH_SIZE,
+        "update_q_table_batch_us_per_transition": per_call_us(
+            lambda: ql.update_q_table_batch(
+                q_table, states, actions, rewards, next_states
+            ),
+            repeats,
+            calls,
+        )
+        / Q_BATCH_SIZE,
+    }
+
+
+def bench_render(repeats):
+    """Cost of drawing one crowded frame with dirty-rectangle updates and with full-window redraws."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    env = crowded_env()
+    results = {}
+    for name, dirty_rects in (("us_per_frame", True), ("us_per_frame_full", False)):
+        env.renderer = Renderer(dirty_rects=dirty_rects)
+        results[name] = per_call_us(env.render, repeats, calls=500)
+    results["video_driver"] = pygame.display.get_driver()
+    return results
+
+
+def bench_training(repeats):
+    """
+    End-to-end training throughput of the zombie_shooter_ql.py training loop.
+
+    The environment, Q-table layout and replay settings are taken from zombie_shooter_ql.py's
+    controls (flat states and a contiguous (540, 9) table by default), and every episode is played
+    by the trainer's own run_episode(); only the checkpoint, metrics and console output are left out.
+    """
+    steps = []
+
+    def run():
+        env_seed, agent_seed, replay_seed = np.random.SeedSequence(SEED).spawn(3)
+        rng = np.random.default_rng(agent_seed)
+        q_table = np.zeros(ql.state_space_size + (ql.action_space_size,), ql.Q_DTYPE)
+        if ql.FLAT_STATES:
+            q_table = q_table.reshape(NUM_STATES, ql.action_space_size)
+        replay = None
+        if ql.REPLAY:
+            buffer_class = (
+                PrioritizedReplayBuffer if ql.REPLAY_PRIORITIZED else ReplayBuffer
+            )
+            replay = buffer_class(ql.REPLAY_CAPACITY, replay_seed)
+        epsilon = 1.0
+        env = ZombieShooterEnv(
+            seed=env_seed, flat_state=ql.FLAT_STATES, action_repeat=ql.ACTION_REPEAT
+        )
+        total_steps = 0
+        start = time.perf_counter()
+        for _ in range(TRAINING_EPISODES):
+            _, episode_steps = ql.run_episode(env, q_table, epsilon, rng, replay)
+            total_steps += episode_steps
+            epsilon = ql.decay_epsilon(epsilon)
+        seconds = time.perf_counter() - start
+        steps.append(total_steps / seconds)
+        return TRAINING_EPISODES, seconds
+
+    episodes_per_sec = best_rate(run, repeats)
+    return {
+        "episodes_per_hour": episodes_per_sec * 3600,
+        "steps_per_sec": max(steps),
+        "flat_states": ql.FLAT_STATES,
+        "replay": ql.REPLAY,
+    }
+
+
+BENCHMARKS = {
+    "step": bench_step,
+    "density": bench_density,
+    "get_state": bench_get_state,
+    "observations": bench_observations,
+    "snapshot": bench_snapshot,
+    "q_update": bench_q_update,
+    "render": bench_render,
+    "training": bench_training,
+}
+
+
+def environment_info():
+    """Returns the commit, library versions and machine the suite runs on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "machine": platform.platform(),
+        "processor": platform.processor(),
+        "seed": SEED,
+    }
+
+
+def run(repeats=REPEATS):
+    """Runs every benchmark and returns the results as a JSON-serializable dict."""
+    results = {"environment": environment_info()}
+    for name, bench in BENCHMARKS.items():
+        results[name] = bench(repeats)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Time every benchmark once instead of best of REPEATS",
+    )
+    args = parser.parse_args()
+
+    results = run(1 if args.quick else REPEATS)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Crash-safe checkpoints of the Q-learning training state, written without blocking the training loop.
+
+A checkpoint is an .npz file holding the Q-table, epsilon, the number of finished episodes and the states of the
+training run's NumPy random generators. It is first written to a temporary file next to the target, flushed to disk with fsync and only then
+renamed over the target, so a crash mid-write never leaves a truncated training_data.npz behind. Before the rename the
+previous checkpoints are shifted to training_data.1.npz, training_data.2.npz, ... keeping the last KEEP_CHECKPOINTS
+versions, and load_latest_checkpoint() falls back to an older version if the newest one cannot be read.
+
+For inference the Q-table can also be exported as a raw .npy file (export_q_table()). load_q_table() opens such a file
+with np.load(mmap_mode="r"), so any number of processes share one read-only, page-cached copy of the table and start
+without reading or unpickling anything; the .npz checkpoint stays the interchange format. Exports are renamed into
+place like checkpoints, so a process that already mapped the old file keeps reading it unchanged.
+
+CheckpointWriter takes a snapshot of the training state on the calling thread (a copy of the small Q-table) and does
+the writing on a background thread, so training continues while the file is written.
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import zipfile
+import numpy as np
+
+KEEP_CHECKPOINTS = 3  # Number of checkpoint versions kept on disk
+
+
+def checkpoint_paths(path, keep=KEEP_CHECKPOINTS):
+    """Returns the paths of the `keep` checkpoint versions of `path`, newest first."""
+    root, ext = os.path.splitext(path)
+    return [path] + [f"{root}.{version}{ext}" for version in range(1, keep)]
+
+
+def snapshot(q_table, epsilon, episode=0, rngs=None):
+    """
+    Returns the arrays stored in a checkpoint as a dict, copying the Q-table.
+
+    Parameters
+    ----------
+    q_table : numpy.ndarray
+        The Q-table.
+    epsilon : float
+        The exploration rate.
+    episode : int
+        Number of finished training episodes.
+    rngs : dict or None
+        numpy.random.Generator objects by name, whose bit generator states are saved.
+    """
+    data = {
+        "q_table": np.array(q_table, copy=True),
+        "epsilon": np.float64(epsilon),
+        "episode": np.int64(episode),
+    }
+    if rngs is not None:
+        # Bit generator states hold integers wider than 64 bits, so they are stored as JSON text
+        data["rng_states"] = np.array(
+            json.dumps({name: rng.bit_generator.state for name, rng in rngs.items()})
+        )
+    return data
+
+
+def restore_rngs(rngs, states):
+    """Sets each numpy.random.Generator in the `rngs` dict to its saved state in `states`, if there is one."""
+    for name, rng in rngs.items():
+        if name in states:
+            rng.bit_generator.state = states[name]
+
+
+def _fsync_directory(directory):
+    """Makes a rename in `directory` durable; directories cannot be opened on Windows."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_temp(path, save):
+    """Calls save(file) on a temporary file next to `path`, flushes it to disk and returns its path."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        save(f)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_path
+
+
+def write_checkpoint(path, data, keep=KEEP_CHECKPOINTS):
+    """
+    Atomically writes the arrays in `data` to `path` as the newest of `keep` checkpoint versions.
+    """
+    tmp_path = _write_temp(path, lambda f: np.savez(f, **data))
+
+    # Shift the older versions up by one, dropping the oldest
+    versions = checkpoint_paths(path, keep)
+    for older, newer in zip(versions[:0:-1], versions[-2::-1]):
+        if os.path.exists(newer):
+            os.replace(newer, older)
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def load_latest_checkpoint(path, keep=KEEP_CHECKPOINTS):
+    """
+    Returns the newest readable checkpoint of `path` as a dict, or None if there is none.
+
+    The dict always has "q_table", "epsilon" (float) and "episode" (int; 0 for files written
+    before episodes were recorded), and "rng_states" (bit generator states by name, see
+    restore_rngs()) if they were saved.
+    """
+    for version in checkpoint_paths(path, keep):
+        try:
+            with np.load(version) as data:
+                checkpoint = {
+                    "q_table": data["q_table"],
+                    "epsilon": float(data["epsilon"]),
+                    "episode": int(data["episode"]) if "episode" in data else 0,
+                }
+                if "rng_states" in data:
+                    checkpoint["rng_states"] = json.loads(str(data["rng_states"]))
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as error:
+            print(f"Skipping unreadable checkpoint {version}: {error}")
+            continue
+        if version != path:
+            print(f"Resuming from older checkpoint {version}")
+        return checkpoint
+    return None
+
+
+def export_q_table(q_table, path):
+    """Atomically writes q_table to `path` as a C-contiguous .npy file that load_q_table() can memory-map."""
+    tmp_path = _write_temp(path, lambda f: np.save(f, np.ascontiguousarray(q_table)))
+    os.replace(tmp_path, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+def load_q_table(path, mmap=True):
+    """
+    Returns the Q-table stored at `path`.
+
+    Parameters
+    ----------
+    path : str
+        A .npy file written by export_q_table(), or an .npz checkpoint (read in full, falling
+        back to older versions like load_latest_checkpoint()).
+    mmap : bool
+        Memory-map a .npy file read-only instead of reading it into memory.
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no readable Q-table at `path`.
+    """
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r" if mmap else None)
+    checkpoint = load_latest_checkpoint(path)
+    if checkpoint is None:
+        raise FileNotFoundError(path)
+    return checkpoint["q_table"]
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints to `path` on a background thread.
+
+    save() returns as soon as the training state has been copied. Errors raised while writing are
+    re-raised by the next save() or close(). Use it as a context manager, or call close() to wait
+    for the pending writes to finish.
+
+    Parameters
+    ----------
+    path : str
+        Checkpoint file to write.
+    keep : int
+        Number of checkpoint versions to keep.
+    q_table_path : str or None
+        If given, every checkpoint's Q-table is also exported to this .npy file.
+    """
+
+    def __init__(self, path, keep=KEEP_CHECKPOINTS, q_table_path=None):
+        self.path = path
+        self.keep = keep
+        self.q_table_path = q_table_path
+        self.error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            try:
+                write_checkpoint(self.path, data, self.keep)
+                if self.q_table_path is not None:
+                    export_q_table(data["q_table"], self.q_table_path)
+            except Exception as error:  # Re-raised on the training thread
+                self.error = error
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def save(self, q_table, epsilon, episode=0, rngs=None):
+        """Queues a checkpoint of the given training state; see snapshot() for the arguments."""
+        self._raise_error()
+        self._queue.put(snapshot(q_table, epsilon, episode, rngs))
+
+    def close(self):
+        """Waits for every queued checkpoint to be written and stops the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    # Export the Q-table of a checkpoint for memory-mapped loading:
+    #     python checkpoint.py [training_data.npz] [training_data.npy]
+    source = sys.argv[1] if len(sys.argv) > 1 else "training_data.npz"
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + ".npy"
+    export_q_table(load_q_table(source), target)
+    print(f"Exported the Q-table of {source} to {target}")
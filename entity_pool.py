@@ -0,0 +1,279 @@
+"""
+Fixed-capacity struct-of-arrays storage for the zombies and bullets of a ZombieShooterEnv.
+
+Every entity lives in a slot of preallocated NumPy arrays (x, y, vx, vy, alive) instead of being its own pygame.Rect.
+Freed slots go back on a free list and are reused lowest-index first, so the slots in use stay packed at the front of
+the arrays and per-frame work only needs to look at the first `high` slots. Positions are floats, so sub-pixel
+movement accumulates instead of being rounded away every frame.
+
+Positions and velocities are stored as (capacity, 2) arrays so one array operation updates both axes; x, y, vx and vy
+are column views of them. Freed slots are parked at NaN, which fails every comparison, so overlap tests need no alive
+mask.
+
+A game usually has only a handful of entities on screen, where the fixed cost of every NumPy call outweighs the work
+it does, so the per-frame work is kept to as few array calls as possible:
+    - while at most SMALL_POOL slots (or SMALL_POOL ** 2 pairs of slots) are in use, overlap tests loop over the
+      slots in Python instead;
+    - a pool created with `bounds` (the bullets) works out at spawn time on which move() each entity leaves the box,
+      so move() frees them from a heap of those moves instead of testing every position every frame.
+"""
+
+import heapq
+import math
+import numpy as np
+
+# Up to this many slots in use (or pairs of slots, squared), per-frame work loops over Python floats instead of
+# calling NumPy
+SMALL_POOL = 8
+
+
+def moves_inside(start, speed, low, high):
+    """
+    Returns how many moves of `speed` per move keep a coordinate starting at `start` within [low, high],
+    or math.inf if it never leaves.
+    """
+    if speed > 0:
+        moves = math.floor((high - start) / speed)
+        # Correct the float division against the positions the moves actually reach
+        while start + (moves + 1) * speed <= high:
+            moves += 1
+        while moves >= 0 and start + moves * speed > high:
+            moves -= 1
+    elif speed < 0:
+        moves = math.floor((start - low) / -speed)
+        while start + (moves + 1) * speed >= low:
+            moves += 1
+        while moves >= 0 and start + moves * speed < low:
+            moves -= 1
+    else:
+        return math.inf if low <= start <= high else -1
+    return moves
+
+
+class EntityPool:
+    """
+    Preallocated storage for up to `capacity` axis-aligned boxes of one size.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of live entities.
+    width, height : int
+        Size of every entity's box in pixels.
+    bounds : tuple or None
+        ((low_x, low_y), (high_x, high_y)) box that the entities' top-left corners must stay in. move() frees every
+        entity on the move that takes it outside. Entities of a pool with bounds keep the velocity they were spawned
+        with, and positions are assumed to add up exactly (as the game's half-pixel positions and integer speeds do).
+    """
+
+    def __init__(self, capacity, width, height, bounds=None):
+        self.capacity = capacity
+        self.width = width
+        self.height = height
+        self.size = np.array([width, height], dtype=float)
+        self.neg_size = -self.size
+        self.bounds = bounds
+        self.pos = np.full((capacity, 2), np.nan)
+        self.vel = np.zeros((capacity, 2))
+        self.x = self.pos[:, 0]
+        self.y = self.pos[:, 1]
+        self.vx = self.vel[:, 0]
+        self.vy = self.vel[:, 1]
+        # Flat views, as 1-D operations are cheaper than broadcasting over (x, y) pairs
+        self.flat_pos = self.pos.reshape(-1)
+        self.flat_vel = self.vel.reshape(-1)
+        self.alive = np.zeros(capacity, dtype=bool)
+        # Number of the move() on which each slot's entity leaves `bounds`
+        self.expires = np.zeros(capacity, dtype=np.int64)
+        # Scratch buffers reused by the per-frame array operations
+        self.scratch = np.zeros(capacity)
+        self.scratch2 = np.zeros((capacity, 2))
+        self.mask = np.zeros(capacity, dtype=bool)
+        self.mask2 = np.zeros((capacity, 2), dtype=bool)
+        self.high = capacity
+        self.clear()
+
+    def clear(self):
+        """Frees every slot."""
+        self.alive[:] = False
+        self.pos[: self.high] = np.nan
+        self.free = list(range(self.capacity))  # Min-heap of free slots
+        self.count = 0  # Number of live entities
+        self.high = 0  # One past the highest slot that may be alive
+        self.moves = 0  # Calls of move()
+        self.expiring = []  # Min-heap of (expires, slot), possibly for slots freed since
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, x, y, vx=0.0, vy=0.0):
+        """
+        Places a new entity in the lowest free slot.
+
+        Returns the slot index, or -1 (and spawns nothing) if the pool is full.
+        """
+        if not self.free:
+            return -1
+        slot = heapq.heappop(self.free)
+        pos = self.flat_pos
+        vel = self.flat_vel
+        pos[slot * 2] = x
+        pos[slot * 2 + 1] = y
+        vel[slot * 2] = vx
+        vel[slot * 2 + 1] = vy
+        self.alive[slot] = True
+        self.count += 1
+        if slot >= self.high:
+            self.high = slot + 1
+        if self.bounds is not None:
+            (low_x, low_y), (high_x, high_y) = self.bounds
+            inside = min(
+                moves_inside(x, vx, low_x, high_x), moves_inside(y, vy, low_y, high_y)
+            )
+            if inside != math.inf:
+                expires = self.moves + inside + 1
+                self.expires[slot] = expires
+                heapq.heappush(self.expiring, (expires, slot))
+        return slot
+
+    def kill(self, slots):
+        """Frees the given live slots (an iterable of indices)."""
+        alive = self.alive
+        pos = self.pos
+        for slot in slots:
+            alive[slot] = False
+            pos[slot] = np.nan
+            heapq.heappush(self.free, slot)
+            self.count -= 1
+        high = self.high
+        while high and not alive[high - 1]:
+            high -= 1
+        self.high = high
+
+    def snapshot(self):
+        """
+        Returns copies of the (positions, velocities, alive, expires) arrays of the first `high` slots and the
+        number of moves made.
+
+        Slots from `high` on are never alive, so these hold the whole pool state; see restore().
+        """
+        n = self.high
+        return (
+            self.pos[:n].copy(),
+            self.vel[:n].copy(),
+            self.alive[:n].copy(),
+            self.expires[:n].copy(),
+            self.moves,
+        )
+
+    def restore(self, snapshot):
+        """Copies a snapshot() back into the pool, which may be restored from any number of times."""
+        pos, vel, alive, expires, moves = snapshot
+        n = len(alive)
+        self.pos[:n] = pos
+        self.vel[:n] = vel
+        self.alive[:n] = alive
+        self.alive[n:] = False
+        self.pos[~self.alive] = np.nan
+        self.expires[:n] = expires
+        self.moves = moves
+        # Slots are handed out lowest first, so the free heap only depends on which slots are free
+        self.free = np.flatnonzero(~self.alive).tolist()
+        self.count = int(np.count_nonzero(alive))
+        self.high = n
+        self.expiring = []
+        if self.bounds is not None:
+            live = np.flatnonzero(alive).tolist()
+            self.expiring = list(zip(self.expires[live].tolist(), live))
+            heapq.heapify(self.expiring)
+
+    def live_slots(self):
+        """Returns the indices of the live slots in ascending order."""
+        return np.flatnonzero(self.alive[: self.high])
+
+    def move(self):
+        """Adds every entity's velocity to its position, freeing those that leave `bounds`."""
+        n = self.high * 2
+        self.flat_pos[:n] += self.flat_vel[:n]
+        self.moves += 1
+        expiring = self.expiring
+        if expiring and expiring[0][0] <= self.moves:
+            leaving = []
+            alive = self.alive
+            expires = self.expires
+            while expiring and expiring[0][0] <= self.moves:
+                when, slot = heapq.heappop(expiring)
+                # Entries of slots freed (and maybe reused) since are skipped; a
+                # reused slot can also have two entries for the same move
+                if alive[slot] and expires[slot] == when and slot not in leaving:
+                    leaving.append(slot)
+            if leaving:
+                self.kill(leaving)
+
+    def overlaps(self, other):
+        """
+        Returns a list of (slot, other_slots) pairs, in ascending slot order, for every live entity of this pool
+        that overlaps live entities of `other`, using pygame.Rect.colliderect rules.
+
+        other_slots lists the overlapped slots of `other` in ascending order.
+        """
+        n = self.high
+        m = other.high
+        if not n or not m:
+            return []
+        if n * m <= SMALL_POOL * SMALL_POOL:
+            coords = self.flat_pos[: n * 2].tolist()
+            xs = coords[::2]
+            ys = coords[1::2]
+            pairs = {}
+            # Few entities of `other` are the outer loop, each testing every entity of this pool
+            for other_slot, (ox, oy) in enumerate(other.pos[:m].tolist()):
+                low_x = ox - self.width
+                high_x = ox + other.width
+                low_y = oy - self.height
+                high_y = oy + other.height
+                for slot, x in enumerate(xs):
+                    if low_x < x < high_x and low_y < ys[slot] < high_y:
+                        pairs.setdefault(slot, []).append(other_slot)
+            return sorted(pairs.items())
+
+        # Boxes overlap when the offset between their top-left corners is
+        # within (-own size, other size) on both axes; parked slots are NaN
+        offset = self.pos[:n, None] - other.pos[:m]
+        close = offset < other.size
+        close &= offset > self.neg_size
+        # Both axes are close when the pair of bools reads as two 1 bytes
+        slots, other_slots = (close.view(np.uint16)[:, :, 0] == 0x0101).nonzero()
+        if not len(slots):
+            return []
+        pairs = {}
+        for slot, other_slot in zip(slots.tolist(), other_slots.tolist()):
+            pairs.setdefault(slot, []).append(other_slot)
+        return list(pairs.items())
+
+    def overlapping(self, x, y, width, height):
+        """
+        Returns the live slots, in ascending order, whose entities overlap the box (x, y, width, height),
+        using pygame.Rect.colliderect rules.
+        """
+        n = self.high
+        if n <= SMALL_POOL:
+            low_x = x - self.width
+            high_x = x + width
+            low_y = y - self.height
+            high_y = y + height
+            coords = self.flat_pos[: n * 2].tolist()
+            return [
+                slot
+                for slot in range(n)
+                if low_x < coords[slot * 2] < high_x
+                and low_y < coords[slot * 2 + 1] < high_y
+            ]
+        offset = self.scratch2[:n]
+        np.subtract(self.pos[:n], (x, y), out=offset)
+        close = self.mask2[:n]
+        np.less(offset, (width, height), out=close)
+        close &= offset > self.neg_size
+        hit = self.mask[:n]
+        np.logical_and(close[:, 0], close[:, 1], out=hit)
+        return hit.nonzero()[0].tolist()
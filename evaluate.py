@@ -0,0 +1,249 @@
+"""
+Headless evaluation of a trained policy over many seeded greedy episodes.
+
+The Q-table is compiled into a greedy policy (see policy.py) and played without exploration, learning or rendering in
+a pool of worker processes. Episode i always plays the game seeded with the i-th child of the run's SeedSequence,
+whichever worker runs it, so an evaluation is reproducible for any number of workers. Each episode records its score
+(zombies killed), survival time, phase reached and damage taken. Episodes still running after MAX_EPISODE_FRAMES
+frames are cut off and counted as truncated. Evaluate with the --action-repeat the Q-table was trained with.
+
+The report gives the mean of every metric with a 95% confidence interval, its standard deviation and percentiles, and
+how often each phase was reached. With --compare, a second Q-table plays the same seeded games, and the report gives
+the mean paired difference of every metric with its own confidence interval. Deploy the new table only if the
+interval lies above zero.
+
+Run With:
+    python evaluate.py [--q-table training_data.npz] [--episodes 10000] [--workers N] [--seed 0]
+    python evaluate.py --q-table new.npz --compare training_data.npz
+"""
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+from checkpoint import load_q_table
+from policy import greedy_policy
+from zombie_shooter_with_rl import ZombieShooterEnv, FPS, PHASES, PLAYER_HEALTH
+
+EVALUATION_EPISODES = 10_000
+EVALUATION_SEED = 0
+MAX_EPISODE_FRAMES = 10 * 60 * FPS  # Ten simulated minutes
+CHUNK_SIZE = 50  # Episodes per pool task
+Z_95 = 1.959964  # Two-sided 95% quantile of the standard normal distribution
+PERCENTILES = (5, 25, 50, 75, 95)
+
+METRICS = ("score", "survival_seconds", "phase", "damage")
+
+# Per-process policies, frame limit and action repeat, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(policies, max_frames, action_repeat):
+    _worker.update(
+        policies=policies, max_frames=max_frames, action_repeat=action_repeat
+    )
+
+
+def play_episode(policy, seed, max_frames=MAX_EPISODE_FRAMES, action_repeat=1):
+    """
+    Plays one greedy episode of the game seeded with `seed`.
+
+    Parameters
+    ----------
+    policy : bytes
+        The action of every flat state, from policy.greedy_policy().
+    seed : numpy.random.SeedSequence or int
+        Seed of the game.
+    max_frames : int
+        Frames after which the episode is cut off.
+    action_repeat : int
+        Frames each action is played for.
+
+    Returns
+    -------
+    tuple
+        (score, survival_seconds, phase, damage, truncated) of the episode.
+    """
+    env = ZombieShooterEnv(seed=seed, flat_state=True, action_repeat=action_repeat)
+    state = env.get_state()
+    while env.frame_count < max_frames:
+        state, _, done = env.step(policy[state])
+        if done:
+            seconds = env.frame_count / FPS
+            return env.final_score, seconds, env.final_phase, PLAYER_HEALTH, False
+    seconds = env.frame_count / FPS
+    return env.score, seconds, env.phase, PLAYER_HEALTH - env.health, True
+
+
+def _run_chunk(seeds):
+    """Plays every seeded episode of a chunk with each policy; returns a (policies, episodes, 5) array."""
+    return np.array(
+        [
+            [
+                play_episode(
+                    policy, seed, _worker["max_frames"], _worker["action_repeat"]
+                )
+                for seed in seeds
+            ]
+            for policy in _worker["policies"]
+        ],
+        dtype=np.float64,
+    )
+
+
+def run_episodes(
+    policies,
+    episodes=EVALUATION_EPISODES,
+    seed=EVALUATION_SEED,
+    workers=None,
+    action_repeat=1,
+):
+    """
+    Plays the same `episodes` seeded games with every policy on a pool of `workers` processes.
+
+    Returns
+    -------
+    list of dict
+        One dict per policy of (episodes,) arrays: the METRICS columns and "truncated".
+    """
+    seeds = np.random.SeedSequence(seed).spawn(episodes)
+    chunks = [seeds[i : i + CHUNK_SIZE] for i in range(0, episodes, CHUNK_SIZE)]
+    with mp.Pool(
+        workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(policies, MAX_EPISODE_FRAMES, action_repeat),
+    ) as pool:
+        results = np.concatenate(pool.map(_run_chunk, chunks), axis=1)
+    return [
+        dict(zip(METRICS, columns[:4]), truncated=columns[4].astype(bool))
+        for columns in results.transpose(0, 2, 1)
+    ]
+
+
+def confidence_interval(values):
+    """Returns the mean of values and the half-width of its normal-approximation 95% confidence interval."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return float(values.mean()), float("nan")
+    return float(values.mean()), Z_95 * float(values.std(ddof=1)) / math.sqrt(
+        len(values)
+    )
+
+
+def summarize(results):
+    """Returns the statistics of one policy's run_episodes() results as a JSON-serializable dict."""
+    summary = {"episodes": len(results["score"])}
+    for metric in METRICS:
+        values = results[metric]
+        mean, half_width = confidence_interval(values)
+        summary[metric] = {
+            "mean": mean,
+            "ci95": [mean - half_width, mean + half_width],
+            "std": float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+            "percentiles": dict(
+                zip(map(str, PERCENTILES), np.percentile(values, PERCENTILES).tolist())
+            ),
+        }
+    phases = np.bincount(results["phase"].astype(np.int64), minlength=len(PHASES))
+    summary["phase_reached"] = {
+        PHASES[phase]["name"]: float(count / summary["episodes"])
+        for phase, count in enumerate(phases)
+    }
+    summary["truncated"] = float(results["truncated"].mean())
+    return summary
+
+
+def compare(results, baseline):
+    """Returns the mean paired difference results - baseline of every metric with its 95% confidence interval."""
+    differences = {}
+    for metric in METRICS:
+        mean, half_width = confidence_interval(results[metric] - baseline[metric])
+        differences[metric] = {
+            "mean_difference": mean,
+            "ci95": [mean - half_width, mean + half_width],
+        }
+    return differences
+
+
+def format_summary(name, summary):
+    """Returns one policy's summary as a printable table."""
+    lines = [
+        f"{name}: {summary['episodes']} episodes, {summary['truncated']:.1%} truncated",
+        f"{'metric':>17} {'mean':>9} {'95% CI':>21} {'std':>9} {'p5':>7} {'p50':>7} {'p95':>7}",
+    ]
+    for metric in METRICS:
+        stats = summary[metric]
+        low, high = stats["ci95"]
+        percentiles = stats["percentiles"]
+        lines.append(
+            f"{metric:>17} {stats['mean']:>9.2f} [{low:>8.2f}, {high:>8.2f}] {stats['std']:>9.2f} "
+            f"{percentiles['5']:>7.1f} {percentiles['50']:>7.1f} {percentiles['95']:>7.1f}"
+        )
+    reached = ", ".join(
+        f"{phase} {share:.1%}" for phase, share in summary["phase_reached"].items()
+    )
+    lines.append(f"{'final phase':>17} {reached}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--q-table",
+        default="training_data.npz",
+        help="Checkpoint (.npz) or exported Q-table (.npy) to evaluate",
+    )
+    parser.add_argument(
+        "--compare",
+        help="Baseline Q-table played on the same seeds; reports paired differences",
+    )
+    parser.add_argument("--episodes", type=int, default=EVALUATION_EPISODES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=EVALUATION_SEED)
+    parser.add_argument(
+        "--action-repeat",
+        type=int,
+        default=1,
+        help="Frames each action is played for; use the value the Q-table was trained with",
+    )
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    paths = [args.q_table] + ([args.compare] if args.compare else [])
+    policies = [greedy_policy(load_q_table(path)).tobytes() for path in paths]
+    start = time.perf_counter()
+    results = run_episodes(
+        policies, args.episodes, args.seed, args.workers, args.action_repeat
+    )
+    seconds = time.perf_counter() - start
+
+    report = {
+        "seed": args.seed,
+        "max_episode_frames": MAX_EPISODE_FRAMES,
+        "action_repeat": args.action_repeat,
+        "seconds": seconds,
+        "policies": {path: summarize(result) for path, result in zip(paths, results)},
+    }
+    for path, summary in report["policies"].items():
+        print(format_summary(path, summary))
+    if args.compare:
+        report["difference"] = compare(results[0], results[1])
+        print(f"{args.q_table} - {args.compare} (paired over the same seeds):")
+        for metric, stats in report["difference"].items():
+            low, high = stats["ci95"]
+            print(
+                f"{metric:>17} {stats['mean_difference']:>+9.2f} [{low:>+8.2f}, {high:>+8.2f}]"
+            )
+    print(f"Evaluated {args.episodes} episodes per policy in {seconds:.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Pixel observations of a ZombieShooterEnv for learners that work on raw frames instead of the 4-tuple state.
+
+PixelObservations draws the game with a headless Renderer to an offscreen Surface (SDL dummy video driver, no window)
+and reads the frame through pygame.surfarray.pixels3d, a NumPy view of the Surface's own pixel memory, so the frame is
+never copied out of pygame. From that view it optionally keeps every `downsample`-th pixel in both directions (a
+strided view, still without copying) and converts to grayscale with integer luminance weights, writing the result
+straight into a preallocated uint8 buffer of the last `stack` frames. No arrays are allocated per frame.
+
+PixelEnv wraps an environment so that reset() and step() return these stacked frames in place of the state tuple.
+
+Observations are (stack, height, width) for grayscale and (stack, height, width, 3) for RGB frames, oldest first.
+"""
+
+import numpy as np
+import pygame
+from zombie_shooter_with_rl import Renderer, WIDTH, HEIGHT
+
+# Integer luminance weights (ITU-R BT.601), summing to 256 so that a shift divides them out
+GRAY_WEIGHTS = (77, 150, 29)
+
+
+class PixelObservations:
+    """
+    Offscreen renderer turning the frames of env into stacked uint8 observations.
+
+    Parameters
+    ----------
+    env : ZombieShooterEnv
+        The environment to observe.
+    grayscale : bool
+        Convert frames to one luminance channel.
+    downsample : int
+        Keep every downsample-th pixel of every downsample-th row.
+    stack : int
+        Number of most recent frames in an observation.
+    """
+
+    def __init__(self, env, grayscale=False, downsample=1, stack=1):
+        self.env = env
+        self.renderer = Renderer(headless=True)
+        self.grayscale = grayscale
+        self.downsample = downsample
+        height = -(-HEIGHT // downsample)
+        width = -(-WIDTH // downsample)
+        frame_shape = (height, width) if grayscale else (height, width, 3)
+        self.frames = np.zeros((stack,) + frame_shape, dtype=np.uint8)
+        if grayscale:
+            self.gray = np.zeros((height, width), dtype=np.uint16)
+            self.channel = np.zeros((height, width), dtype=np.uint16)
+
+    @property
+    def shape(self):
+        """Shape of an observation."""
+        return self.frames.shape
+
+    def pixels(self):
+        """
+        Returns a zero-copy (HEIGHT, WIDTH, 3) uint8 view of the last drawn frame.
+
+        The view locks the offscreen Surface, so it must be deleted before the next frame is drawn.
+        """
+        return pygame.surfarray.pixels3d(self.renderer.screen).transpose(1, 0, 2)
+
+    def capture(self, frame):
+        """Draws the current game and writes it into `frame`, one frame of the observation buffer."""
+        self.renderer.draw(self.env)
+        step = self.downsample
+        # Surface arrays are indexed (x, y); transpose the view to (row, column)
+        pixels = pygame.surfarray.pixels3d(self.renderer.screen)[::step, ::step]
+        pixels = pixels.transpose(1, 0, 2)
+        if self.grayscale:
+            gray = self.gray
+            channel = self.channel
+            np.multiply(pixels[..., 0], np.uint16(GRAY_WEIGHTS[0]), out=gray)
+            for index in (1, 2):
+                np.multiply(
+                    pixels[..., index], np.uint16(GRAY_WEIGHTS[index]), out=channel
+                )
+                gray += channel
+            gray >>= 8
+            np.copyto(frame, gray, casting="unsafe")
+        else:
+            frame[...] = pixels
+        del pixels  # Unlock the Surface for the next draw
+
+    def reset(self):
+        """Fills every stacked frame with the current game frame and returns the observation."""
+        frames = self.frames
+        self.capture(frames[-1])
+        frames[:-1] = frames[-1]
+        return frames
+
+    def observe(self):
+        """
+        Shifts the current game frame into the stack and returns the observation.
+
+        The returned array is the observation buffer itself and is overwritten by the next call;
+        copy it to keep it.
+        """
+        frames = self.frames
+        frames[:-1] = frames[1:]
+        self.capture(frames[-1])
+        return frames
+
+
+class PixelEnv:
+    """
+    Wraps a ZombieShooterEnv so that reset() and step() return pixel observations.
+
+    The keyword arguments are those of PixelObservations. The frame stack restarts at the
+    beginning of every game, including the game that step() starts after a death.
+    """
+
+    def __init__(self, env, **observation_options):
+        self.env = env
+        self.observations = PixelObservations(env, **observation_options)
+
+    def reset(self):
+        self.env.reset()
+        return self.observations.reset()
+
+    def step(self, action):
+        """Same as ZombieShooterEnv.step(), returning the stacked frames as the next state."""
+        _, reward, done = self.env.step(action)
+        if done:
+            return self.observations.reset(), reward, done
+        return self.observations.observe(), reward, done
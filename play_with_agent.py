@@ -3,45 +3,91 @@ This code acts as a game loop for the zombie shooter game using Pygame, where an
 
 Code Analysis:
 
-1. It loads a pre-trained Q-table from a file (`training_data.npz`) if it exists, otherwise it exits.
+1. It loads a pre-trained Q-table, memory-mapping `training_data.npy` if it exists and is not older than `training_data.npz`, and loading `training_data.npz` otherwise; without either it exits.
 
-2. It resets the game and gets the initial state.
+2. It compiles the Q-table into a greedy policy of one action byte per state (see policy.py), or, when POLICY_PATH is set, loads a policy exported with `python policy.py` unless it is older than the Q-table.
 
-3. It enters a game loop where it:
-   - Chooses the best action from the Q-table based on the current state.
+3. It resets the game and gets the initial state.
+
+4. It enters a game loop where it:
+   - Looks up the best action for the current state in the policy.
    - Performs the chosen action in the game and gets the next state, reward, and whether the game is over.
    - Updates the state.
    - Draws the game screen.
    - Limits the game speed to a certain frames per second (FPS).
 
-4. The loop continues until the game is over, at which point it prints a message and quits Pygame.
+5. The loop continues until the game is over, at which point it prints a message, saves a compact recording of the episode (see recording.py) and quits Pygame.
 
 About Q-table:
 
 The Q-table is a data structure that stores the expected reward for each state-action pair, which is used to make decisions in the game. The agent uses this Q-table to play the game without any exploration or learning.
 """
 
+import os
 import pygame
 import sys
-import numpy as np
-from zombie_shooter_with_rl import get_state, step, reset_game, draw_game, clock, FPS
+from checkpoint import load_q_table
+from policy import greedy_policy, load_policy
+from recording import EpisodeRecorder, new_seed, save_recordings
+from zombie_shooter_with_rl import ZombieShooterEnv
 
 TRAINING_FILE = (
     "training_data.npz"  # storing q-values and epsilon for the trained model
 )
-
-# Load the trained Q-table
-try:
-    data = np.load(TRAINING_FILE)
-    q_table = data["q_table"]
-    print(f"Successfully loaded Q-table from {TRAINING_FILE}")
-except FileNotFoundError:
+Q_TABLE_FILE = "training_data.npy"  # memory-mappable Q-table exported by the trainer
+# Frames per decision; use the ACTION_REPEAT the Q-table was trained with
+ACTION_REPEAT = 1
+# The played episode is recorded here (see recording.py); None to skip recording
+RECORD_FILE = "last_episode.npz"
+# Policy exported with `python policy.py` to play instead of compiling the Q-table (e.g. policy.POLICY_FILE);
+# None to always compile it. An export older than the loaded Q-table is ignored as stale.
+POLICY_PATH = None
+
+# Load the trained Q-table, sharing the page-cached .npy file with other processes when there is one.
+# The trainer exports the .npy after each checkpoint, so a .npy older than the checkpoint is stale.
+paths = (Q_TABLE_FILE, TRAINING_FILE)
+if (
+    os.path.exists(Q_TABLE_FILE)
+    and os.path.exists(TRAINING_FILE)
+    and os.path.getmtime(Q_TABLE_FILE) < os.path.getmtime(TRAINING_FILE)
+):
+    print(
+        f"{Q_TABLE_FILE} is older than {TRAINING_FILE}; loading the checkpoint instead"
+    )
+    paths = (TRAINING_FILE,)
+for path in paths:
+    try:
+        q_table = load_q_table(path)
+    except FileNotFoundError:
+        continue
+    print(f"Successfully loaded Q-table from {path}")
+    break
+else:
     print(f"Error: Training file '{TRAINING_FILE}' not found. Cannot run the agent.")
     sys.exit()
 
+# The greedy action of every state, as bytes: one lookup per frame and no argmax
+if (
+    POLICY_PATH is not None
+    and os.path.exists(POLICY_PATH)
+    and os.path.getmtime(POLICY_PATH) >= os.path.getmtime(path)
+):
+    policy = load_policy(POLICY_PATH)
+    print(f"Using the exported policy {POLICY_PATH}")
+else:
+    if POLICY_PATH is not None:
+        print(
+            f"{POLICY_PATH} is missing or older than {path}; compiling the Q-table instead"
+        )
+    policy = greedy_policy(q_table).tobytes()
+
 # Main Game Loop
-reset_game()
-state = get_state()
+seed = new_seed()
+env = ZombieShooterEnv(
+    render=True, flat_state=True, seed=seed, action_repeat=ACTION_REPEAT
+)
+recorder = EpisodeRecorder(seed, ACTION_REPEAT)
+state = env.reset()
 game_over = False
 
 while not game_over:
@@ -50,11 +96,12 @@ while not game_over:
             pygame.quit()
             sys.exit()
 
-    # 1. Choose the BEST action from the Q-table (no exploration)
-    action = np.argmax(q_table[state])
+    # 1. Choose the BEST action from the policy (no exploration)
+    action = policy[state]
 
     # 2. Perform the action in the game
-    next_state, reward, done = step(action)
+    next_state, reward, done = env.step(action)
+    recorder.record(env, action, done)
 
     # Check if the step function indicated the game is over
     if done:
@@ -65,10 +112,13 @@ while not game_over:
     state = next_state
 
     # 4. Draw the game screen
-    draw_game()
+    env.render()
 
     # 5. Tick the clock
-    clock.tick(FPS)
+    env.tick()
 
 print("Game over. The agent has finished playing.")
+if RECORD_FILE is not None:
+    save_recordings(RECORD_FILE, [recorder])
+    print(f"Episode recorded; replay it with: python recording.py replay {RECORD_FILE}")
 pygame.quit()
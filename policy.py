@@ -0,0 +1,84 @@
+"""
+Compiled greedy policies: a trained Q-table collapsed into one action byte per state.
+
+A policy that no longer learns only ever needs argmax(Q(s, a)) for each state, so greedy_policy() computes it once for
+every state and stores the result as a uint8 array indexed by the flat state (see state_encoding.flat_state()). At play
+time a decision is then a single byte lookup, `policy[state]`, with no NumPy reduction in the loop. Ties go to the
+lowest action, exactly like np.argmax(q_table[state]).
+
+The policy can be saved as a .npy file or written out as a Python module holding a plain tuple, for inference
+processes that do not have NumPy. load_policy() reads either back as a bytes object.
+
+Run With:
+    python policy.py [training_data.npz] [training_policy.npy | training_policy.py]
+"""
+
+import ast
+import os
+import sys
+import numpy as np
+from checkpoint import load_q_table
+from state_encoding import NUM_STATES
+
+POLICY_FILE = "training_policy.npy"
+
+
+def greedy_policy(q_table):
+    """
+    Returns the greedy action of every state of q_table as a (540,) uint8 array.
+
+    Parameters
+    ----------
+    q_table : numpy.ndarray
+        A (5, 4, 3, 9, 9) or (540, 9) Q-table.
+    """
+    actions = np.asarray(q_table).reshape(NUM_STATES, -1).argmax(axis=1)
+    return actions.astype(np.uint8)
+
+
+def policy_source(policy):
+    """Returns the source of a Python module that defines the policy as the tuple POLICY."""
+    actions = ", ".join(str(action) for action in bytes(policy))
+    return (
+        '"""Greedy zombie shooter policy: the action of every flat state (see policy.py)."""\n\n'
+        f"POLICY = ({actions},)\n"
+    )
+
+
+def save_policy(policy, path=POLICY_FILE):
+    """Writes the policy to `path`: a .npy file, or a Python module holding a tuple if `path` ends in .py."""
+    if path.endswith(".py"):
+        with open(path, "w") as f:
+            f.write(policy_source(policy))
+    else:
+        np.save(path, np.asarray(policy, dtype=np.uint8))
+
+
+def load_policy(path=POLICY_FILE):
+    """
+    Returns the policy saved at `path` as a bytes object, so that `policy[state]` is the action of a flat state.
+
+    A .py policy is parsed without being executed.
+    """
+    if path.endswith(".py"):
+        with open(path) as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if (
+                isinstance(node, ast.Assign)
+                and ast.unparse(node.targets[0]) == "POLICY"
+            ):
+                return bytes(ast.literal_eval(node.value))
+        raise ValueError(f"{path} does not define POLICY")
+    return np.load(path).tobytes()
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "training_data.npz"
+    target = sys.argv[2] if len(sys.argv) > 2 else POLICY_FILE
+    policy = greedy_policy(load_q_table(source))
+    save_policy(policy, target)
+    print(
+        f"Wrote the greedy policy of {source} to {target} "
+        f"({os.path.getsize(target)} bytes, {NUM_STATES} states)"
+    )
@@ -0,0 +1,113 @@
+"""
+Per-section timing of ZombieShooterEnv.step() for finding what dominates the hot loop.
+
+step() is made of one method call per section (apply_action, update_phase, spawn_zombie, move_zombies, move_bullets,
+check_bullet_hits, check_player_hits, get_state). StepProfiler.attach() shadows those methods on one environment
+instance with timed wrappers and detach() removes the wrappers again, so profiling can be switched on and off at any
+time and an environment that is not being profiled runs the plain methods with no extra cost at all.
+
+Besides the cumulative time of every section the profiler counts steps, the zombies and bullets alive at the start of
+every step and the bullet-zombie pairs the collision check had to consider.
+"""
+
+import time
+
+# step() section name of every profiled ZombieShooterEnv method, in step() order
+SECTIONS = {
+    "apply_action": "action",
+    "update_phase": "phase",
+    "spawn_zombie": "spawn",
+    "move_zombies": "move zombies",
+    "move_bullets": "move bullets",
+    "check_bullet_hits": "bullet hits",
+    "check_player_hits": "player hits",
+    "get_state": "get_state",
+}
+
+
+class StepProfiler:
+    """
+    Cumulative per-section timers and counters for the ZombieShooterEnv instances it is attached to.
+    """
+
+    def __init__(self):
+        self.times = dict.fromkeys(SECTIONS.values(), 0.0)
+        self.counters = dict.fromkeys(
+            ("steps", "zombies", "bullets", "collision_pairs"), 0
+        )
+        self.step_time = 0.0
+
+    def reset(self):
+        """Zeroes every timer and counter, keeping the attached wrappers pointed at them."""
+        for section in self.times:
+            self.times[section] = 0.0
+        for counter in self.counters:
+            self.counters[counter] = 0
+        self.step_time = 0.0
+
+    def _timed(self, section, method):
+        times = self.times
+        clock = time.perf_counter
+
+        def timed(*args):
+            start = clock()
+            result = method(*args)
+            times[section] += clock() - start
+            return result
+
+        return timed
+
+    def attach(self, env):
+        """Starts profiling env by shadowing its step() sections with timed wrappers."""
+        counters = self.counters
+        clock = time.perf_counter
+        for name, section in SECTIONS.items():
+            setattr(
+                env, name, self._timed(section, getattr(type(env), name).__get__(env))
+            )
+
+        check_bullet_hits = env.check_bullet_hits
+
+        def counted_check_bullet_hits():
+            counters["collision_pairs"] += len(env.bullets) * len(env.zombies)
+            return check_bullet_hits()
+
+        env.check_bullet_hits = counted_check_bullet_hits
+
+        step = type(env).step.__get__(env)
+
+        def counted_step(action):
+            counters["steps"] += 1
+            counters["zombies"] += len(env.zombies)
+            counters["bullets"] += len(env.bullets)
+            start = clock()
+            result = step(action)
+            self.step_time += clock() - start
+            return result
+
+        env.step = counted_step
+
+    def detach(self, env):
+        """Stops profiling env, restoring its plain methods."""
+        for name in list(SECTIONS) + ["step"]:
+            env.__dict__.pop(name, None)
+
+    def report(self):
+        """Returns the timing breakdown and average counters since the last reset() as a printable table."""
+        steps = max(self.counters["steps"], 1)
+        total = self.step_time or 1.0
+        lines = [f"{'section':>14} {'us/step':>9} {'share':>7}"]
+        for section, seconds in self.times.items():
+            lines.append(
+                f"{section:>14} {seconds / steps * 1e6:>9.2f} {seconds / total:>7.1%}"
+            )
+        other = self.step_time - sum(self.times.values())
+        lines.append(f"{'other':>14} {other / steps * 1e6:>9.2f} {other / total:>7.1%}")
+        lines.append(f"{'step':>14} {self.step_time / steps * 1e6:>9.2f}")
+        lines.append(
+            f"{self.counters['steps']} steps, per step: "
+            f"{self.counters['zombies'] / steps:.1f} zombies, "
+            f"{self.counters['bullets'] / steps:.1f} bullets, "
+            f"{self.counters['collision_pairs'] / steps:.1f} collision pairs"
+        )
+        return "\n".join(lines)
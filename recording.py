@@ -0,0 +1,332 @@
+"""
+Compact episode recordings and fast headless replay.
+
+The game is deterministic for a given seed and action sequence (see ZombieShooterEnv), so an episode is recorded as
+its seed, its action repeat and its actions packed two to a byte (actions are 0-8 and fit in 4 bits). Every
+VERIFY_INTERVAL steps the score and health are also stored, plus the final score, so a replay can verify that it
+re-simulates exactly the recorded game. With the default interval that is about 0.6 bytes per step
+before the archive is compressed.
+
+Many episodes are stored in one archive (save_recordings() / load_recordings()), an .npz file of a few flat arrays.
+
+EpisodeReplayer re-simulates a recorded episode headlessly at full speed, verifying the score/health trajectory
+on the way, and caches a clone_state() snapshot every KEYFRAME_INTERVAL steps so that seeking backwards is cheap. Only
+the segments passed to render() are drawn, at the game's frame rate, so a failure can be watched without sitting
+through the rest of the episode.
+
+Run With:
+    python recording.py record [--episodes 100] [--seed 0] [--q-table training_data.npz] [--output recordings.npz]
+    python recording.py replay [recordings.npz] [--episode 0] [--start STEP] [--stop STEP] [--verify]
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+from checkpoint import load_q_table
+from policy import greedy_policy
+from zombie_shooter_with_rl import ZombieShooterEnv, Renderer
+
+RECORDING_FILE = "recordings.npz"
+VERIFY_INTERVAL = 60  # Steps between recorded (score, health) checks
+KEYFRAME_INTERVAL = 600  # Steps between the snapshots a replayer caches for seeking
+REPLAY_TAIL_STEPS = 300  # Steps before an episode's end that replay shows by default
+
+
+def new_seed():
+    """Returns a fresh random 64-bit environment seed to record."""
+    return int(np.random.SeedSequence().generate_state(1, np.uint64)[0])
+
+
+def pack_actions(actions):
+    """Packs a sequence of actions (0-15) two to a byte, the first in the low 4 bits."""
+    actions = np.asarray(actions, dtype=np.uint8)
+    if len(actions) % 2:
+        actions = np.append(actions, np.uint8(0))
+    return actions[0::2] | (actions[1::2] << 4)
+
+
+def unpack_actions(packed, count):
+    """Returns the first `count` actions of a pack_actions() array."""
+    actions = np.empty(2 * len(packed), dtype=np.uint8)
+    actions[0::2] = packed & 0x0F
+    actions[1::2] = packed >> 4
+    return actions[:count]
+
+
+class EpisodeRecorder:
+    """
+    Records one episode of a ZombieShooterEnv created with ZombieShooterEnv(seed=seed, action_repeat=action_repeat).
+
+    Call record() after every step() of the episode; the episode is complete once step() returns done.
+
+    Parameters
+    ----------
+    seed : int
+        The environment's seed.
+    action_repeat : int
+        The environment's action_repeat.
+    """
+
+    def __init__(self, seed, action_repeat=1):
+        self.seed = seed
+        self.action_repeat = action_repeat
+        self.actions = bytearray()
+        self.checks = []  # (score, health) after every VERIFY_INTERVAL steps
+        self.score = None  # Final score, once the episode has ended
+
+    def __len__(self):
+        return len(self.actions)
+
+    def record(self, env, action, done):
+        """Records the action of the step() that just returned done."""
+        self.actions.append(action)
+        if done:
+            self.score = env.final_score
+        elif len(self.actions) % VERIFY_INTERVAL == 0:
+            self.checks.append((env.score, env.health))
+
+
+def save_recordings(path, recorders):
+    """Writes the EpisodeRecorder list `recorders`, whose episodes must have ended, to one compressed archive."""
+    lengths = np.array([len(recorder) for recorder in recorders], dtype=np.int64)
+    checks = [np.array(recorder.checks, dtype=np.int32) for recorder in recorders]
+    np.savez_compressed(
+        path,
+        verify_interval=np.int64(VERIFY_INTERVAL),
+        seeds=np.array([recorder.seed for recorder in recorders], dtype=np.uint64),
+        action_repeats=np.array(
+            [recorder.action_repeat for recorder in recorders], dtype=np.uint8
+        ),
+        lengths=lengths,
+        scores=np.array([recorder.score for recorder in recorders], dtype=np.int64),
+        actions=np.concatenate(
+            [pack_actions(recorder.actions) for recorder in recorders]
+            or [np.zeros(0, np.uint8)]
+        ),
+        checks=np.concatenate(
+            [check.reshape(-1, 2) for check in checks] or [np.zeros((0, 2), np.int32)]
+        ),
+    )
+
+
+class Recordings:
+    """
+    The episodes of an archive written by save_recordings(); see load_recordings().
+
+    Attributes
+    ----------
+    seeds, action_repeats, lengths, scores : numpy.ndarray
+        (N,) per-episode seed, action repeat, number of steps and final score.
+    """
+
+    def __init__(self, data):
+        self.verify_interval = int(data["verify_interval"])
+        self.seeds = data["seeds"]
+        self.action_repeats = data["action_repeats"]
+        self.lengths = data["lengths"]
+        self.scores = data["scores"]
+        self.packed_actions = data["actions"]
+        self.checks = data["checks"]
+        # Where every episode's packed actions and checks start
+        self.action_offsets = np.concatenate(([0], np.cumsum((self.lengths + 1) // 2)))
+        self.check_offsets = np.concatenate(
+            ([0], np.cumsum((self.lengths - 1) // self.verify_interval))
+        )
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def episode(self, index):
+        """Returns episode `index` as a dict of seed, action_repeat, actions, checks and score."""
+        length = int(self.lengths[index])
+        packed = self.packed_actions[
+            self.action_offsets[index] : self.action_offsets[index + 1]
+        ]
+        return {
+            "seed": int(self.seeds[index]),
+            "action_repeat": int(self.action_repeats[index]),
+            "actions": unpack_actions(packed, length),
+            "checks": self.checks[
+                self.check_offsets[index] : self.check_offsets[index + 1]
+            ],
+            "verify_interval": self.verify_interval,
+            "score": int(self.scores[index]),
+        }
+
+
+def load_recordings(path=RECORDING_FILE):
+    """Reads an archive written by save_recordings()."""
+    with np.load(path) as data:
+        return Recordings({name: data[name] for name in data.files})
+
+
+class EpisodeReplayer:
+    """
+    Re-simulates a recorded episode, from Recordings.episode(), without drawing it.
+
+    step_index is the number of recorded steps played so far. Every step checks the recorded
+    (score, health) trajectory and the final score, raising ValueError at the first step where the
+    re-simulation differs from the recording.
+    """
+
+    def __init__(self, episode):
+        self.episode = episode
+        self.actions = episode["actions"]
+        self.env = ZombieShooterEnv(
+            seed=episode["seed"], action_repeat=episode["action_repeat"]
+        )
+        self.step_index = 0
+        self.keyframes = {0: self.env.clone_state()}
+
+    def __len__(self):
+        return len(self.actions)
+
+    def advance(self):
+        """Plays the next recorded step and verifies it."""
+        env = self.env
+        _, _, done = env.step(int(self.actions[self.step_index]))
+        self.step_index += 1
+        step = self.step_index
+        if step % KEYFRAME_INTERVAL == 0:
+            self.keyframes[step] = env.clone_state()
+
+        interval = self.episode["verify_interval"]
+        if done != (step == len(self)):
+            raise ValueError(
+                f"Replay diverged at step {step}: the game "
+                f"{'ended' if done else 'did not end'} but the recording has {len(self)} steps"
+            )
+        if done:
+            if env.final_score != self.episode["score"]:
+                raise ValueError(
+                    f"Replay diverged: final score {env.final_score}, recorded {self.episode['score']}"
+                )
+        elif step % interval == 0:
+            recorded = tuple(self.episode["checks"][step // interval - 1].tolist())
+            if (env.score, env.health) != recorded:
+                raise ValueError(
+                    f"Replay diverged at step {step}: (score, health) {(env.score, env.health)}, "
+                    f"recorded {recorded}"
+                )
+
+    def seek(self, step):
+        """Re-simulates up to `step` recorded steps, starting from the nearest cached snapshot."""
+        step = min(step, len(self))
+        if step < self.step_index:
+            keyframe = max(frame for frame in self.keyframes if frame <= step)
+            self.env.restore_state(self.keyframes[keyframe])
+            self.step_index = keyframe
+        while self.step_index < step:
+            self.advance()
+
+    def verify(self):
+        """Re-simulates and verifies the whole episode."""
+        self.seek(len(self))
+
+    def render(self, start, stop=None):
+        """Jumps to step `start` headlessly, then draws steps up to `stop` (the end by default) in a window."""
+        self.seek(start)
+        stop = len(self) if stop is None else min(stop, len(self))
+        env = self.env
+        env.renderer = Renderer()
+        try:
+            while self.step_index < stop:
+                self.advance()
+                env.render()
+                env.tick()
+        finally:
+            env.renderer = None
+
+
+def record(policy, episodes, seed=None, action_repeat=1):
+    """
+    Plays `episodes` greedy episodes of a compiled policy (policy.py) headlessly and records them.
+
+    Returns
+    -------
+    list of EpisodeRecorder
+    """
+    seeds = np.random.SeedSequence(seed).generate_state(episodes, np.uint64).tolist()
+    recorders = []
+    for episode_seed in seeds:
+        env = ZombieShooterEnv(
+            seed=episode_seed, flat_state=True, action_repeat=action_repeat
+        )
+        recorder = EpisodeRecorder(episode_seed, action_repeat)
+        state = env.get_state()
+        done = False
+        while not done:
+            action = policy[state]
+            state, _, done = env.step(action)
+            recorder.record(env, action, done)
+        recorders.append(recorder)
+    return recorders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser(
+        "record", help="Record greedy episodes headlessly"
+    )
+    record_parser.add_argument("--q-table", default="training_data.npz")
+    record_parser.add_argument("--episodes", type=int, default=100)
+    record_parser.add_argument("--seed", type=int)
+    record_parser.add_argument("--action-repeat", type=int, default=1)
+    record_parser.add_argument("--output", default=RECORDING_FILE)
+    replay_parser = commands.add_parser(
+        "replay", help="Verify and watch a recorded episode"
+    )
+    replay_parser.add_argument("path", nargs="?", default=RECORDING_FILE)
+    replay_parser.add_argument("--episode", type=int, default=0)
+    replay_parser.add_argument(
+        "--start",
+        type=int,
+        help=f"First step to show (default: {REPLAY_TAIL_STEPS} steps before the end)",
+    )
+    replay_parser.add_argument("--stop", type=int, help="Step to stop showing at")
+    replay_parser.add_argument(
+        "--verify", action="store_true", help="Verify every episode without drawing"
+    )
+    args = parser.parse_args()
+
+    if args.command == "record":
+        policy = greedy_policy(load_q_table(args.q_table)).tobytes()
+        start = time.perf_counter()
+        recorders = record(policy, args.episodes, args.seed, args.action_repeat)
+        seconds = time.perf_counter() - start
+        save_recordings(args.output, recorders)
+        steps = sum(len(recorder) for recorder in recorders)
+        print(
+            f"Recorded {args.episodes} episodes ({steps} steps) in {seconds:.1f}s to {args.output}: "
+            f"{os.path.getsize(args.output) / max(steps, 1):.2f} bytes/step"
+        )
+        return
+
+    recordings = load_recordings(args.path)
+    if args.verify:
+        start = time.perf_counter()
+        for index in range(len(recordings)):
+            EpisodeReplayer(recordings.episode(index)).verify()
+        seconds = time.perf_counter() - start
+        steps = int(recordings.lengths.sum())
+        print(
+            f"Verified {len(recordings)} episodes ({steps} steps) in {seconds:.1f}s, "
+            f"{steps / seconds:,.0f} steps/sec"
+        )
+        return
+
+    replayer = EpisodeReplayer(recordings.episode(args.episode))
+    start = (
+        max(len(replayer) - REPLAY_TAIL_STEPS, 0) if args.start is None else args.start
+    )
+    print(
+        f"Episode {args.episode}: {len(replayer)} steps, score {recordings.scores[args.episode]}; "
+        f"showing steps {start}-{args.stop or len(replayer)}"
+    )
+    replayer.render(start, args.stop)
+
+
+if __name__ == "__main__":
+    main()
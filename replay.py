@@ -0,0 +1,240 @@
+"""
+Experience replay for the tabular Q-learner.
+
+ReplayBuffer stores transitions (state, action, reward, next_state, done) in preallocated typed NumPy arrays used as
+a ring buffer: once it is full every new transition overwrites the oldest one, and nothing is allocated after
+construction. States are flat state indices (see state_encoding.flat_state()), so one transition takes 14 bytes and a
+buffer of 10^7 transitions about 140 MB.
+
+PrioritizedReplayBuffer samples transitions in proportion to |TD error|^alpha instead of uniformly, keeping the
+priorities in a SumTree so that inserting, sampling and updating a priority each take O(log capacity). Its samples
+come with importance-sampling weights that correct for the non-uniform sampling; pass them to
+zombie_shooter_ql.update_q_table_batch() as its `weights`, and feed the TD errors it returns back with
+update_priorities().
+
+Minibatches from either buffer plug straight into update_q_table_batch(), which applies a whole batch with a few
+array operations.
+"""
+
+import numpy as np
+
+REPLAY_ALPHA = 0.6  # Prioritization exponent; 0 samples uniformly
+REPLAY_BETA = 0.4  # Importance-sampling exponent; 1 fully corrects the sampling bias
+PRIORITY_EPSILON = 1e-6  # Added to |TD error| so that no transition stops being sampled
+
+
+class SumTree:
+    """
+    Binary tree of non-negative priorities in which every node holds the sum of its children.
+
+    The leaves are stored in tree[size:2 * size] and node i has the children 2i and 2i + 1, so
+    tree[1] is the total of all priorities.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of leaves; rounded up to a power of two internally.
+    """
+
+    def __init__(self, capacity):
+        self.size = 1 << max(capacity - 1, 0).bit_length()
+        self.depth = self.size.bit_length() - 1
+        self.tree = np.zeros(2 * self.size)
+
+    @property
+    def total(self):
+        """Sum of all priorities."""
+        return self.tree[1]
+
+    def priorities(self, indices):
+        """Returns the priorities of the leaves at `indices`."""
+        return self.tree[np.asarray(indices) + self.size]
+
+    def set(self, index, priority):
+        """Sets the priority of one leaf and updates its ancestors."""
+        tree = self.tree
+        node = index + self.size
+        tree[node] = priority
+        node >>= 1
+        while node:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node >>= 1
+
+    def update(self, indices, priorities):
+        """Sets the priorities of the leaves at `indices`, updating each ancestor once per level."""
+        tree = self.tree
+        nodes = np.asarray(indices, dtype=np.int64) + self.size
+        tree[nodes] = priorities
+        nodes = np.unique(nodes)
+        for _ in range(self.depth):
+            # Halving keeps the nodes sorted, so duplicates are neighbours
+            nodes >>= 1
+            nodes = nodes[np.diff(nodes, prepend=-1) != 0]
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+
+    def find(self, values):
+        """
+        Returns the leaf index of every prefix-sum value in `values`.
+
+        Leaf i is returned for the values in [sum of the priorities before i, that sum plus
+        priority i), so values drawn uniformly from [0, total) pick leaves in proportion to their
+        priorities.
+        """
+        tree = self.tree
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            nodes *= 2
+            left_sums = tree[nodes]
+            right = values >= left_sums
+            values -= np.where(right, left_sums, 0.0)
+            nodes += right
+        return nodes - self.size
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring buffer of transitions with uniform sampling.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of transitions kept.
+    seed : int, numpy.random.SeedSequence or None
+        Seed of the buffer's random generator (rng), which draws the samples.
+    """
+
+    def __init__(self, capacity, seed=None):
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.uint8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.rng = np.random.default_rng(seed)
+        self.position = 0  # Slot the next transition is written to
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Stores one transition, overwriting the oldest one when the buffer is full, and returns its slot."""
+        slot = self.position
+        self.states[slot] = state
+        self.actions[slot] = action
+        self.rewards[slot] = reward
+        self.next_states[slot] = next_state
+        self.dones[slot] = done
+        self.position = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return slot
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Stores N transitions given as (N,) arrays in order and returns their slots.
+
+        When N exceeds the capacity only the last `capacity` transitions are kept.
+        """
+        count = len(states)
+        keep = min(count, self.capacity)
+        slots = (self.position + count - keep + np.arange(keep)) % self.capacity
+        for column, values in (
+            (self.states, states),
+            (self.actions, actions),
+            (self.rewards, rewards),
+            (self.next_states, next_states),
+            (self.dones, dones),
+        ):
+            column[slots] = np.asarray(values)[count - keep :]
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        return slots
+
+    def transitions(self, slots):
+        """Returns the (states, actions, rewards, next_states, dones) arrays of the transitions at `slots`."""
+        return (
+            self.states[slots],
+            self.actions[slots],
+            self.rewards[slots],
+            self.next_states[slots],
+            self.dones[slots],
+        )
+
+    def sample(self, batch_size):
+        """
+        Draws batch_size transitions uniformly with replacement.
+
+        Returns
+        -------
+        tuple
+            (slots, transitions), where transitions is the tuple of transitions().
+        """
+        slots = self.rng.integers(self.size, size=batch_size)
+        return slots, self.transitions(slots)
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Ring buffer of transitions sampled in proportion to their priority |TD error|^alpha.
+
+    New transitions get the highest priority seen so far, so each is likely to be sampled at
+    least once before its TD error is known.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of transitions kept.
+    seed : int, numpy.random.SeedSequence or None
+        Seed of the buffer's random generator (rng), which draws the samples.
+    alpha : float
+        Prioritization exponent; 0 samples uniformly.
+    beta : float
+        Importance-sampling exponent; 1 fully corrects the sampling bias.
+    """
+
+    def __init__(self, capacity, seed=None, alpha=REPLAY_ALPHA, beta=REPLAY_BETA):
+        super().__init__(capacity, seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0  # Highest |TD error| + PRIORITY_EPSILON seen so far
+
+    def add(self, state, action, reward, next_state, done):
+        slot = super().add(state, action, reward, next_state, done)
+        self.tree.set(slot, self.max_priority**self.alpha)
+        return slot
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        slots = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(slots, self.max_priority**self.alpha)
+        return slots
+
+    def sample(self, batch_size):
+        """
+        Draws batch_size transitions in proportion to their priorities.
+
+        One transition is drawn from each of batch_size equal slices of the total priority, which
+        spreads a batch over the buffer with less variance than independent draws.
+
+        Returns
+        -------
+        tuple
+            (slots, transitions, weights), where transitions is the tuple of transitions() and
+            weights the (batch_size,) importance-sampling weights, scaled so that the largest is 1.
+        """
+        total = self.tree.total
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * (
+            total / batch_size
+        )
+        # Rounding can carry a value just past the last filled slot
+        slots = np.minimum(self.tree.find(values), self.size - 1)
+        probabilities = self.tree.priorities(slots) / total
+        weights = (self.size * probabilities) ** -self.beta
+        return slots, self.transitions(slots), weights / weights.max()
+
+    def update_priorities(self, slots, td_errors):
+        """Sets the priorities of the transitions at `slots` from their new TD errors."""
+        priorities = np.abs(td_errors) + PRIORITY_EPSILON
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(slots, priorities**self.alpha)
@@ -193,7 +193,7 @@ def update_game():
     leading to a game over if health reaches zero.
     """
 
-    global phase, phase_start, last_spawn, health, game_over, score
+    global phase, phase_start, last_spawn, health, game_over, score, zombies, bullets
     # Update phase
     if phase < len(PHASES) - 1 and time.time() - phase_start > PHASES[phase]["time"]:
         phase += 1
@@ -215,36 +215,45 @@ def update_game():
         last_spawn = now
     # Move zombies
     zombie_speed = PHASES[phase]["zombie_speed"]
-    for zombie in zombies[:]:
+    for zombie in zombies:
         dx = player.centerx - zombie.centerx
         dy = player.centery - zombie.centery
         dist = (dx**2 + dy**2) ** 0.5
         if dist > 0:
             zombie.x += (dx / dist) * zombie_speed
             zombie.y += (dy / dist) * zombie_speed
-        if not (-40 <= zombie.x <= WIDTH and -40 <= zombie.y <= HEIGHT):
-            zombies.remove(zombie)
+    zombies = [z for z in zombies if -40 <= z.x <= WIDTH and -40 <= z.y <= HEIGHT]
     # Move bullets
-    for bullet, direction in bullets[:]:
+    for bullet, direction in bullets:
         bullet.x += direction[0] * BULLET_SPEED
         bullet.y += direction[1] * BULLET_SPEED
-        if not (0 <= bullet.x <= WIDTH and 0 <= bullet.y <= HEIGHT):
-            bullets.remove((bullet, direction))
-    # Check collisions
-    for bullet, _ in bullets[:]:
-        for zombie in zombies[:]:
-            if bullet.colliderect(zombie):
-                bullets.remove((bullet, _))
-                zombies.remove(zombie)
-                score += 1
-                break
-    for zombie in zombies[:]:
-        if player.colliderect(zombie):
-            zombies.remove(zombie)
-            health -= 1
-            if health <= 0:
-                game_over = True
-                reset_game()
+    bullets = [
+        (bullet, direction)
+        for bullet, direction in bullets
+        if 0 <= bullet.x <= WIDTH and 0 <= bullet.y <= HEIGHT
+    ]
+    # Check collisions: each bullet takes the first zombie it overlaps
+    if zombies and bullets:
+        hit_zombies = set()
+        surviving_bullets = []
+        for bullet, direction in bullets:
+            for index in bullet.collidelistall(zombies):
+                if index not in hit_zombies:
+                    hit_zombies.add(index)
+                    break
+            else:
+                surviving_bullets.append((bullet, direction))
+        if hit_zombies:
+            bullets = surviving_bullets
+            zombies = [z for index, z in enumerate(zombies) if index not in hit_zombies]
+            score += len(hit_zombies)
+    touching = player.collidelistall(zombies)
+    if touching:
+        zombies = [z for index, z in enumerate(zombies) if index not in touching]
+        health -= len(touching)
+        if health <= 0:
+            game_over = True
+            reset_game()
 
 
 def draw_game():
@@ -0,0 +1,304 @@
+"""
+Parallel Q-learning trainer for the zombie shooter game.
+
+Environment workers run in a process pool and all learn into one (5, 4, 3, 9, 9) Q-table that is kept in shared
+memory. Two update modes are supported:
+
+- "hogwild": every worker applies its Q-learning updates straight to the shared table without any locking. Updates
+  from different workers can occasionally overwrite each other, which tabular Q-learning tolerates well.
+- "merge": every worker learns into a private copy of the table and, every MERGE_INTERVAL episodes, adds the changes
+  it made since the last merge to the shared table (under a lock) and continues from the merged table.
+
+The epsilon schedule is coordinated across workers: a single shared epsilon is decayed once for every finished
+episode, whichever worker finished it, so N workers follow the same schedule as zombie_shooter_ql.py does for the
+same total number of episodes.
+
+Run With:
+    python zombie_shooter_parallel_ql.py [--workers N] [--mode hogwild|merge]
+    python zombie_shooter_parallel_ql.py --benchmark   # steps/sec at 1, 2, 4, ... workers
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from checkpoint import export_q_table, snapshot, write_checkpoint
+from zombie_shooter_with_rl import ZombieShooterEnv
+from zombie_shooter_ql import (
+    TRAINING_FILE,
+    Q_TABLE_FILE,
+    ACTION_REPEAT,
+    episodes,
+    action_space_size,
+    state_space_size,
+    load_training_data,
+    choose_action,
+    update_q_table,
+    decay_epsilon,
+)
+
+NUM_WORKERS = os.cpu_count()
+UPDATE_MODE = "hogwild"  # "hogwild" or "merge"
+MERGE_INTERVAL = 10  # Episodes between merges of a worker's table in "merge" mode
+BENCHMARK_SECONDS = 10  # Training time per worker count in the scaling benchmark
+
+Q_TABLE_SHAPE = state_space_size + (action_space_size,)
+
+# Per-process worker state, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(shm_name, shared_epsilon, episode_counter, lock, mode, merge_interval):
+    """Attaches a pool process to the shared Q-table and the shared training counters."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(
+        shm=shm,  # Keeps the shared memory mapped for the lifetime of the process
+        q_table=np.ndarray(Q_TABLE_SHAPE, dtype=np.float64, buffer=shm.buf),
+        epsilon=shared_epsilon,
+        episode_counter=episode_counter,
+        lock=lock,
+        mode=mode,
+        merge_interval=merge_interval,
+    )
+
+
+def _merge(local_q, snapshot):
+    """Adds the changes made to local_q since snapshot to the shared table and resyncs both copies."""
+    shared_q = _worker["q_table"]
+    with _worker["lock"]:
+        shared_q += local_q - snapshot
+        local_q[:] = shared_q
+    snapshot[:] = local_q
+
+
+def _run_worker(args):
+    """
+    Runs training episodes in a pool process until the shared episode budget or the deadline is used up.
+
+    args is (total_episodes, deadline, seed), where seed is this worker's numpy.random.SeedSequence.
+
+    Returns
+    -------
+    tuple
+        (steps taken, episodes finished, seconds spent) for this worker.
+    """
+    total_episodes, deadline, seed = args
+    lock = _worker["lock"]
+    shared_epsilon = _worker["epsilon"]
+    episode_counter = _worker["episode_counter"]
+    merge = _worker["mode"] == "merge"
+
+    if merge:
+        q_table = _worker["q_table"].copy()
+        snapshot = q_table.copy()
+    else:
+        q_table = _worker["q_table"]
+
+    # Every worker has its own independent streams for the game and for exploration
+    env_seed, agent_seed = seed.spawn(2)
+    env = ZombieShooterEnv(seed=env_seed, action_repeat=ACTION_REPEAT)
+    rng = np.random.default_rng(agent_seed)
+    steps = 0
+    finished = 0
+    start = time.monotonic()
+    while deadline is None or time.monotonic() < deadline:
+        # Claim the next episode of the shared budget
+        with lock:
+            if episode_counter.value >= total_episodes:
+                break
+            episode_counter.value += 1
+
+        epsilon = shared_epsilon.value
+        state = env.reset()
+        done = False
+        while not done:
+            action = choose_action(q_table, state, epsilon, rng)
+            next_state, reward, done = env.step(action)
+            update_q_table(q_table, state, action, reward, next_state)
+            state = next_state
+            steps += 1
+        finished += 1
+
+        with lock:
+            shared_epsilon.value = decay_epsilon(shared_epsilon.value)
+
+        if merge and finished % _worker["merge_interval"] == 0:
+            _merge(q_table, snapshot)
+
+    if merge:
+        _merge(q_table, snapshot)
+    return steps, finished, time.monotonic() - start
+
+
+def train_parallel(
+    q_table,
+    epsilon,
+    num_workers=NUM_WORKERS,
+    total_episodes=episodes,
+    mode=UPDATE_MODE,
+    merge_interval=MERGE_INTERVAL,
+    time_limit=None,
+    seed=None,
+):
+    """
+    Trains q_table with num_workers processes sharing one Q-table.
+
+    Parameters
+    ----------
+    q_table : numpy.ndarray
+        Initial Q-table of shape (5, 4, 3, 9, 9).
+    epsilon : float
+        Initial exploration rate, decayed once per finished episode across all workers.
+    num_workers : int
+        Number of pool processes.
+    total_episodes : int
+        Total number of episodes to run across all workers.
+    mode : str
+        "hogwild" for lock-free updates of the shared table, "merge" for periodic merging of per-worker tables.
+    merge_interval : int
+        Episodes between merges in "merge" mode.
+    time_limit : float or None
+        Stop claiming new episodes after this many seconds.
+    seed : int or None
+        Seed from which every worker's random streams are derived.
+
+    Returns
+    -------
+    tuple
+        (trained q_table, final epsilon, total steps, steps per second, episodes finished).
+    """
+    if mode not in ("hogwild", "merge"):
+        raise ValueError(f"Unknown update mode: {mode!r}")
+
+    shm = shared_memory.SharedMemory(
+        create=True, size=np.dtype(np.float64).itemsize * q_table.size
+    )
+    try:
+        shared_q = np.ndarray(Q_TABLE_SHAPE, dtype=np.float64, buffer=shm.buf)
+        shared_q[:] = q_table
+        lock = mp.Lock()
+        shared_epsilon = mp.Value("d", float(epsilon), lock=False)
+        episode_counter = mp.Value("l", 0, lock=False)
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+
+        with mp.Pool(
+            num_workers,
+            initializer=_init_worker,
+            initargs=(
+                shm.name,
+                shared_epsilon,
+                episode_counter,
+                lock,
+                mode,
+                merge_interval,
+            ),
+        ) as pool:
+            worker_seeds = np.random.SeedSequence(seed).spawn(num_workers)
+            results = pool.map(
+                _run_worker,
+                [
+                    (total_episodes, deadline, worker_seed)
+                    for worker_seed in worker_seeds
+                ],
+            )
+
+        trained = shared_q.copy()
+        del shared_q
+    finally:
+        shm.close()
+        shm.unlink()
+
+    total_steps = sum(steps for steps, _, _ in results)
+    elapsed = max(seconds for _, _, seconds in results)
+    return (
+        trained,
+        shared_epsilon.value,
+        total_steps,
+        total_steps / elapsed if elapsed else 0.0,
+        sum(finished for _, finished, _ in results),
+    )
+
+
+def _saved_rngs(states):
+    """Returns generators set to the saved bit generator `states` by name, or None if there are none."""
+    if states is None:
+        return None
+    rngs = {}
+    for name, state in states.items():
+        bit_generator = getattr(np.random, state["bit_generator"])()
+        bit_generator.state = state
+        rngs[name] = np.random.Generator(bit_generator)
+    return rngs
+
+
+def benchmark_scaling(
+    max_workers=NUM_WORKERS, seconds=BENCHMARK_SECONDS, mode=UPDATE_MODE
+):
+    """
+    Prints the training throughput in steps/sec at 1, 2, 4, ... workers up to max_workers.
+    """
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != max_workers:
+        worker_counts.append(max_workers)
+
+    print(f"Scaling benchmark ({mode}, {seconds}s per run)")
+    print(f"{'workers':>8} {'steps/sec':>12} {'speedup':>8}")
+    baseline = None
+    for num_workers in worker_counts:
+        _, _, _, steps_per_sec, _ = train_parallel(
+            np.zeros(Q_TABLE_SHAPE),
+            1.0,
+            num_workers=num_workers,
+            total_episodes=10**9,
+            mode=mode,
+            time_limit=seconds,
+        )
+        baseline = baseline or steps_per_sec
+        print(
+            f"{num_workers:>8} {steps_per_sec:>12,.0f} {steps_per_sec / baseline:>7.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--mode", choices=("hogwild", "merge"), default=UPDATE_MODE)
+    parser.add_argument("--episodes", type=int, default=episodes)
+    parser.add_argument("--seed", type=int, help="Seed for reproducible worker streams")
+    parser.add_argument(
+        "--benchmark", action="store_true", help="Run the worker scaling benchmark"
+    )
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_scaling(args.workers, mode=args.mode)
+        return
+
+    q_table, epsilon, episode, rng_states = load_training_data()
+    q_table, epsilon, total_steps, steps_per_sec, finished = train_parallel(
+        q_table,
+        epsilon,
+        num_workers=args.workers,
+        total_episodes=args.episodes,
+        mode=args.mode,
+        seed=args.seed,
+    )
+    print(
+        f"Training finished. Steps: {total_steps}, Steps/sec: {steps_per_sec:,.0f}, Epsilon: {epsilon:.4f}"
+    )
+    # Continue the loaded episode count and keep zombie_shooter_ql.py's saved random
+    # streams, which the workers do not use, so that trainer resumes where it left off
+    write_checkpoint(
+        TRAINING_FILE,
+        snapshot(q_table, epsilon, episode + finished, _saved_rngs(rng_states)),
+    )
+    if Q_TABLE_FILE is not None:
+        export_q_table(q_table, Q_TABLE_FILE)
+
+
+if __name__ == "__main__":
+    main()
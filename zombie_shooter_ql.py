@@ -12,35 +12,69 @@ Code Analysis:
 3. Main Training Loop: The code runs multiple episodes of the game, where each episode consists of the following steps:
    - Choose Action: Select an action based on the current state using an epsilon-greedy policy (i.e., choose a random action with probability epsilon or the action with the highest Q-value).
 
-   - Take Action: Perform the chosen action in the game environment and receive a reward.
+   - Take Action: Perform the chosen action in the game environment and receive a reward. With ACTION_REPEAT = k the action is played for k frames and their rewards are summed.
 
    - Update Q-table: Update the Q-table using the Q-learning update rule:
         - Q(s, a) = Q(s, a) + alpha \* (reward + gamma \* max(Q(s', a')) - Q(s, a))
 
+   - Batched API: choose_actions(), greedy_actions() and update_q_table_batch() do the same for arrays of states and transitions from many games at once (e.g. VecZombieShooterEnv) with a few array operations.
+
+   - State Layout: with FLAT_STATES the environment returns each state as one integer in range(540) (see state_encoding.flat_state()) and the Q-table is a C-contiguous (540, 9) array of Q_DTYPE, so every lookup and update indexes a single contiguous row instead of building a 5-tuple index. Checkpoints keep the (5, 4, 3, 9, 9) shape either way.
+
+   - Experience Replay: with REPLAY set, every transition is also stored in a ring buffer (see replay.py) and every REPLAY_INTERVAL steps a minibatch sampled from it, uniformly or by TD error, is applied with update_q_table_batch().
+
+   - Episodes: run_episode() plays one episode with these steps; train() and the benchmark suite both call it.
+
    - Decay Epsilon: Gradually decrease the exploration rate (epsilon) over time.
 
-4. Save Training Data: The code periodically saves the Q-table and epsilon value to a file for future use.
+4. Save Training Data: The code periodically checkpoints the Q-table, epsilon, episode counter and random generator states on a background thread (see checkpoint.py), and resumes from the newest valid checkpoint. The Q-table is also exported to Q_TABLE_FILE, a raw .npy file that inference processes can memory-map.
+
+5. Metrics: Per-episode records (reward, length, kills, phase reached, epsilon, steps/sec) are buffered and written in chunks to METRICS_DIR; load them with load_metrics(). A progress line is printed every PRINT_INTERVAL episodes.
 """
 
+import cProfile
+import os
 import pygame
 import sys
+import time
 import numpy as np
-import random
-from zombie_shooter_with_rl import (
-    get_state,
-    step,
-    reset_game,
-    draw_game,
-    clock,
-    FPS,
-    main,
-)
+from checkpoint import CheckpointWriter, load_latest_checkpoint, restore_rngs
+from profiling import StepProfiler
+from replay import PrioritizedReplayBuffer, ReplayBuffer
+from state_encoding import NUM_STATES, flat_state, flat_states
+from zombie_shooter_with_rl import ZombieShooterEnv
 
 # Training Controls for customising training process and loading training data
 VISUAL_TRAINING = False  # Set to False to train without graphics for max speed
 LOAD_TRAINING_DATA = True  # Set to True to continue training from a saved file
 SAVE_INTERVAL = 100  # Save the training data every 100 episodes
 TRAINING_FILE = "training_data.npz"  # File to save/load data
+# Memory-mappable copy of the Q-table written with every checkpoint, for inference (None to skip)
+Q_TABLE_FILE = "training_data.npy"
+METRICS_DIR = "training_metrics"  # Directory of per-episode metrics chunks
+METRICS_FLUSH_INTERVAL = 100  # Episodes buffered before a metrics chunk is written
+PRINT_INTERVAL = 10  # Print a progress line every 10 episodes
+TRAINING_SEED = None  # Set to an integer to make a training run reproducible
+FLAT_STATES = True  # Train on flat integer states with a contiguous (540, 9) Q-table
+Q_DTYPE = np.float64  # Set to np.float32 to halve the Q-table's memory
+ACTION_REPEAT = (
+    1  # Frames each chosen action is played for (see ZombieShooterEnv.step())
+)
+
+# Experience replay controls (replay.py): extra minibatch updates from stored transitions
+REPLAY = False  # Set to True to also learn from replayed transitions
+REPLAY_PRIORITIZED = (
+    False  # Set to True to sample transitions by TD error instead of uniformly
+)
+REPLAY_CAPACITY = 1_000_000  # Transitions kept; the oldest are overwritten
+REPLAY_BATCH_SIZE = 64
+REPLAY_INTERVAL = 4  # Steps between replayed minibatches
+
+# Profiling controls
+PROFILE = False  # Set to True to print a step() timing breakdown every PROFILE_INTERVAL episodes
+PROFILE_INTERVAL = 100
+# Set to a file name (e.g. "training.pstats") to dump cProfile stats
+PROFILE_STATS_FILE = None
 
 # Q-learning parameters
 alpha = 0.1
@@ -53,25 +87,38 @@ action_space_size = 9
 # Simplified state space
 state_space_size = (5, 4, 3, 9)  # (player_pos, health, phase, zombie_direction)
 
-# Either initialise or load Q-table and epsilon
-if LOAD_TRAINING_DATA:
-    try:
-        data = np.load(TRAINING_FILE)
-        q_table = data["q_table"]
-        epsilon = data["epsilon"]
-        print(
-            f"Loaded training data. Q-table shape: {q_table.shape}, Epsilon: {epsilon:.4f}"
-        )
-    except FileNotFoundError:
+
+def load_training_data():
+    """
+    Either initialises or loads the training state from the newest valid checkpoint.
+
+    Returns
+    -------
+    tuple
+        (q_table, epsilon, episode, rng_states), where episode is the number of finished
+        episodes and rng_states the saved random generator states or None. A zero Q-table,
+        epsilon = 1.0 (max exploration), episode 0 and no generator states are returned when
+        LOAD_TRAINING_DATA is False or no readable checkpoint exists.
+    """
+    if LOAD_TRAINING_DATA:
+        checkpoint = load_latest_checkpoint(TRAINING_FILE)
+        if checkpoint is not None:
+            q_table = checkpoint["q_table"]
+            epsilon = checkpoint["epsilon"]
+            print(
+                f"Loaded training data. Q-table shape: {q_table.shape}, Epsilon: {epsilon:.4f}, "
+                f"Episode: {checkpoint['episode']}"
+            )
+            return q_table, epsilon, checkpoint["episode"], checkpoint.get("rng_states")
         print("No training data found. Starting from scratch.")
-        q_table = np.zeros(state_space_size + (action_space_size,))
-        epsilon = 1.0  # Start with max exploration
-else:
-    q_table = np.zeros(state_space_size + (action_space_size,))
-    epsilon = 1.0  # Start with max exploration
+    return np.zeros(state_space_size + (action_space_size,)), 1.0, 0, None
+
 
+# Generator used by choose_action() when it is not given one
+_rng = np.random.default_rng()
 
-def choose_action(state):
+
+def choose_action(q_table, state, epsilon, rng=None):
     """
     Chooses an action based on the given state.
 
@@ -81,8 +128,14 @@ def choose_action(state):
 
     Parameters
     ----------
+    q_table : numpy.ndarray
+        The Q-table to act on.
     state : tuple
         The current game state.
+    epsilon : float
+        The exploration rate.
+    rng : numpy.random.Generator or None
+        Generator for the exploration decisions; a module-level unseeded one when None.
 
     Returns
     -------
@@ -90,57 +143,388 @@ def choose_action(state):
         The chosen action index.
     """
 
-    if random.uniform(0, 1) < epsilon:
-        return random.randint(0, action_space_size - 1)  # Explore
+    if rng is None:
+        rng = _rng
+    if rng.random() < epsilon:
+        return int(rng.integers(action_space_size))  # Explore
     else:
         return np.argmax(q_table[state])  # Exploit
 
 
-# --- Main Training Loop ---
-for episode in range(1, episodes + 1):
-    state = reset_game()
-    state = get_state()
-    total_reward = 0
-    done = False
+def update_q_table(q_table, state, action, reward, next_state):
+    """
+    Applies the Q-learning update rule to q_table in place:
+        Q(s, a) = (1 - alpha) * Q(s, a) + alpha * (reward + gamma * max(Q(s', a')))
 
-    while not done:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                # Save on exit and quit
-                np.savez(TRAINING_FILE, q_table=q_table, epsilon=epsilon)
-                pygame.quit()
-                sys.exit()
+    States are tuples for a (5, 4, 3, 9, 9) Q-table or flat integer states for a (540, 9) one.
+    """
+    values = q_table[state]  # A view of the state's action values
+    next_max = q_table[next_state].max()
+    values[action] = (1 - alpha) * values[action] + alpha * (reward + gamma * next_max)
 
-        action = choose_action(state)
-        next_state, reward, done = step(action)
 
-        old_value = q_table[state + (action,)]
-        next_max = np.max(q_table[next_state])
+def choose_actions(q_table, states, epsilon, rng=None):
+    """
+    Batched choose_action(): returns one epsilon-greedy action per row of the (N, 4) states array.
 
-        new_value = (1 - alpha) * old_value + alpha * (reward + gamma * next_max)
-        q_table[state + (action,)] = new_value
+    Parameters
+    ----------
+    q_table : numpy.ndarray
+        The Q-table to act on.
+    states : numpy.ndarray
+        (N, 4) integer array of game states, e.g. from VecZombieShooterEnv.get_state(), or (N,)
+        array of flat states.
+    epsilon : float
+        The exploration rate.
+    rng : numpy.random.Generator or None
+        Generator for the exploration decisions; a module-level unseeded one when None.
 
-        state = next_state
-        total_reward += reward
+    Returns
+    -------
+    numpy.ndarray
+        (N,) array of action indices.
+    """
+    if rng is None:
+        rng = _rng
+    actions = greedy_actions(q_table, states)
+    explore = rng.random(len(actions)) < epsilon
+    actions[explore] = rng.integers(action_space_size, size=np.count_nonzero(explore))
+    return actions
+
+
+def state_rows(states):
+    """Returns the flat Q-table rows of an (N, 4) states array; (N,) flat states are returned as they are."""
+    states = np.asarray(states)
+    return states if states.ndim == 1 else flat_states(states)
+
+
+def greedy_actions(q_table, states):
+    """Returns the (N,) highest-valued actions for the (N, 4) states array, ties going to the lowest action."""
+    return q_table.reshape(-1, action_space_size)[state_rows(states)].argmax(axis=1)
+
+
+def update_q_table_batch(
+    q_table, states, actions, rewards, next_states, dones=None, weights=None
+):
+    """
+    Applies the Q-learning update rule to q_table in place for a batch of N transitions.
 
-        if VISUAL_TRAINING:
-            draw_game()
+    All targets reward + gamma * max(Q(s', a')) are computed from the table as it was before
+    the batch. Transitions that update the same (state, action) pair are applied in batch
+    order, exactly as N calls of update_q_table() with those targets would:
+        Q(s, a) = (1 - alpha)^k * Q(s, a) + sum_i alpha * (1 - alpha)^(k - i) * target_i
+    for the k updates i = 1..k of the pair, so repeated pairs can never overshoot.
 
-        clock.tick(FPS)
+    Parameters
+    ----------
+    q_table : numpy.ndarray
+        The Q-table to update.
+    states, next_states : numpy.ndarray
+        (N, 4) integer arrays of game states, or (N,) arrays of flat states.
+    actions : numpy.ndarray
+        (N,) array of the actions taken.
+    rewards : numpy.ndarray
+        (N,) array of the rewards received.
+    dones : numpy.ndarray or None
+        (N,) boolean array of transitions that ended a game, whose targets are just the
+        reward. When None every target bootstraps from next_states, like update_q_table().
+    weights : numpy.ndarray or None
+        (N,) per-transition weights in [0, 1] that scale the learning rate of each update to
+        alpha * weight, e.g. the importance-sampling weights of a PrioritizedReplayBuffer.
 
-    # Decay epsilon
+    Returns
+    -------
+    numpy.ndarray
+        (N,) TD errors target - Q(s, a) against the table as it was before the batch.
+    """
+    if not q_table.flags.c_contiguous:
+        raise ValueError("update_q_table_batch() needs a C-contiguous Q-table")
+    q_rows = q_table.reshape(-1, action_space_size)  # A view, so updates reach q_table
+    rows = state_rows(states)
+    next_rows = state_rows(next_states)
+    next_max = q_rows[next_rows].max(axis=1)
+    if dones is not None:
+        next_max = np.where(dones, 0.0, next_max)
+    targets = rewards + gamma * next_max
+    td_errors = targets - q_rows[rows, actions]
+
+    # Group the transitions by flat (state, action) index, keeping batch order in each group
+    flat = rows * action_space_size + np.asarray(actions)
+    order = np.argsort(flat, kind="stable")
+    flat = flat[order]
+    targets = targets[order]
+    first = np.diff(flat, prepend=-1) != 0
+    starts = np.flatnonzero(first)
+    group = np.cumsum(first) - 1
+    sizes = np.diff(starts, append=len(flat))
+
+    ends = starts + sizes - 1
+    if weights is None:
+        # Update i of a group of k is discounted by (1 - alpha) for each later update
+        remaining = ends[group] - np.arange(len(flat))
+        coefficients = alpha * (1 - alpha) ** remaining
+        keep = (1 - alpha) ** sizes
+    else:
+        # The same with a learning rate per update: products of (1 - rate) are differences of
+        # a running sum of logs
+        rates = alpha * np.asarray(weights)[order]
+        log_keep = np.cumsum(np.log1p(-rates))
+        coefficients = rates * np.exp(log_keep[ends][group] - log_keep)
+        keep = np.exp(log_keep[ends] - log_keep[starts] + np.log1p(-rates[starts]))
+    contributions = np.bincount(group, weights=coefficients * targets)
+
+    q_flat = q_rows.reshape(-1)
+    pairs = flat[starts]
+    q_flat[pairs] = keep * q_flat[pairs] + contributions
+    return td_errors
+
+
+def replay_update(q_table, replay, batch_size=REPLAY_BATCH_SIZE):
+    """
+    Applies one minibatch of transitions sampled from a replay buffer with update_q_table_batch().
+
+    A PrioritizedReplayBuffer's importance-sampling weights scale the updates, and the TD errors
+    of the batch become the sampled transitions' new priorities. The stored dones are not passed
+    on, so every target bootstraps from the next state like the online update_q_table() does.
+    """
+    if isinstance(replay, PrioritizedReplayBuffer):
+        slots, transitions, weights = replay.sample(batch_size)
+        states, actions, rewards, next_states, _ = transitions
+        td_errors = update_q_table_batch(
+            q_table, states, actions, rewards, next_states, weights=weights
+        )
+        replay.update_priorities(slots, td_errors)
+    else:
+        _, (states, actions, rewards, next_states, _) = replay.sample(batch_size)
+        update_q_table_batch(q_table, states, actions, rewards, next_states)
+
+
+def decay_epsilon(epsilon):
+    """Returns epsilon after one episode of decay, stopping once it is below epsilon_min."""
     if epsilon > epsilon_min:
         epsilon *= epsilon_decay
+    return epsilon
+
+
+def run_episode(env, q_table, epsilon, rng, replay=None, visual=False):
+    """
+    Plays one training episode from env.reset(), learning online from every step.
+
+    Every step chooses an epsilon-greedy action, applies update_q_table() and, with a replay
+    buffer, stores the transition and applies replay_update() every REPLAY_INTERVAL steps. With
+    `visual` the game is drawn and frame limited, and closing the window ends the episode early.
 
-    print(
-        f"Episode: {episode}, Total Reward: {total_reward:.2f}, Epsilon: {epsilon:.4f}"
+    Returns (total_reward, steps), or None if the window was closed.
+    """
+    state = env.reset()
+    total_reward = 0
+    steps = 0
+    done = False
+    while not done:
+        if visual:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return None
+
+        action = choose_action(q_table, state, epsilon, rng)
+        next_state, reward, done = env.step(action)
+        update_q_table(q_table, state, action, reward, next_state)
+
+        if replay is not None:
+            if FLAT_STATES:
+                replay.add(state, action, reward, next_state, done)
+            else:
+                replay.add(
+                    flat_state(*state),
+                    action,
+                    reward,
+                    flat_state(*next_state),
+                    done,
+                )
+            if steps % REPLAY_INTERVAL == 0 and len(replay) >= REPLAY_BATCH_SIZE:
+                replay_update(q_table, replay)
+
+        state = next_state
+        total_reward += reward
+        steps += 1
+
+        if visual:
+            env.render()
+            env.tick()  # Only limit the frame rate when watching
+    return total_reward, steps
+
+
+class MetricsLog:
+    """
+    Buffers per-episode training metrics and appends them to `directory` in chunks.
+
+    Every chunk is an .npz file named after its first episode, holding one array per column
+    (episode, reward, length, kills, phase, epsilon, steps_per_sec). A chunk is written to a
+    temporary file and renamed into place, so a crash loses at most the buffered episodes, and
+    a resumed run rewrites the chunks of the episodes it repeats.
+    """
+
+    COLUMNS = (
+        "episode",
+        "reward",
+        "length",
+        "kills",
+        "phase",
+        "epsilon",
+        "steps_per_sec",
     )
 
-    # Periodically save the Q-table AND epsilon
-    if episode % SAVE_INTERVAL == 0:
-        np.savez(TRAINING_FILE, q_table=q_table, epsilon=epsilon)
-        print(f"--- Training data saved at episode {episode} ---")
+    def __init__(self, directory=METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buffer = {column: [] for column in self.COLUMNS}
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, episode, reward, length, kills, phase, epsilon, steps_per_sec):
+        """Buffers the metrics of one episode, writing a chunk every flush_interval episodes."""
+        for column, value in zip(
+            self.COLUMNS,
+            (episode, reward, length, kills, phase, epsilon, steps_per_sec),
+        ):
+            self.buffer[column].append(value)
+        if episode % self.flush_interval == 0:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered episodes as one chunk."""
+        episodes_buffered = self.buffer["episode"]
+        if not episodes_buffered:
+            return
+        path = os.path.join(self.directory, f"episodes_{episodes_buffered[0]:08d}.npz")
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(
+                f,
+                **{column: np.array(values) for column, values in self.buffer.items()},
+            )
+        os.replace(f"{path}.tmp", path)
+        for values in self.buffer.values():
+            values.clear()
+
+
+def load_metrics(directory=METRICS_DIR):
+    """
+    Returns every metrics chunk in `directory` joined into one dict of column arrays, ordered by episode.
 
-print("Training finished.")
-# Final save
-np.savez(TRAINING_FILE, q_table=q_table, epsilon=epsilon)
+    When a resumed run repeated episodes, only the latest record of each episode is kept.
+    """
+    chunks = []
+    for name in sorted(os.listdir(directory)):
+        if name.startswith("episodes_") and name.endswith(".npz"):
+            # Copy the columns out so each file is closed before the next is opened
+            with np.load(os.path.join(directory, name)) as chunk:
+                chunks.append({column: chunk[column] for column in MetricsLog.COLUMNS})
+    if not chunks:
+        return {column: np.array([]) for column in MetricsLog.COLUMNS}
+    metrics = {
+        column: np.concatenate([chunk[column] for chunk in chunks])
+        for column in MetricsLog.COLUMNS
+    }
+    # np.unique keeps the first occurrence, so search the reversed records for the latest one
+    _, last = np.unique(metrics["episode"][::-1], return_index=True)
+    keep = len(metrics["episode"]) - 1 - last
+    return {column: values[keep] for column, values in metrics.items()}
+
+
+def train():
+    """Runs the main training loop, checkpointing the training state to TRAINING_FILE."""
+    q_table, epsilon, finished_episodes, rng_states = load_training_data()
+    q_table = q_table.astype(Q_DTYPE, order="C")
+    # Checkpoints always hold the (5, 4, 3, 9, 9) table; this view shares q_table's memory
+    saved_q_table = q_table.reshape(state_space_size + (action_space_size,))
+    if FLAT_STATES:
+        # One contiguous row of action values per flat state
+        q_table = q_table.reshape(NUM_STATES, action_space_size)
+
+    # Independent random streams for the game, for exploration and for replay sampling, all
+    # derived from TRAINING_SEED and saved in every checkpoint
+    env_seed, agent_seed, replay_seed = np.random.SeedSequence(TRAINING_SEED).spawn(3)
+    # Headless environments open no window and are stepped without frame limiting
+    env = ZombieShooterEnv(
+        render=VISUAL_TRAINING,
+        seed=env_seed,
+        flat_state=FLAT_STATES,
+        action_repeat=ACTION_REPEAT,
+    )
+    rng = np.random.default_rng(agent_seed)
+    rngs = {"env": env.rng, "agent": rng}
+    replay = None
+    if REPLAY:
+        # The buffer itself is not checkpointed; a resumed run starts with an empty one
+        buffer_class = PrioritizedReplayBuffer if REPLAY_PRIORITIZED else ReplayBuffer
+        replay = buffer_class(REPLAY_CAPACITY, replay_seed)
+        rngs["replay"] = replay.rng
+    if rng_states is not None:
+        # Continue the exact random sequences of the saved run
+        restore_rngs(rngs, rng_states)
+
+    checkpoints = CheckpointWriter(TRAINING_FILE, q_table_path=Q_TABLE_FILE)
+    metrics = MetricsLog()
+    profiler = StepProfiler()
+    if PROFILE:
+        profiler.attach(env)
+    stats = cProfile.Profile() if PROFILE_STATS_FILE else None
+    if stats is not None:
+        stats.enable()
+
+    # --- Main Training Loop ---
+    try:
+        for episode in range(finished_episodes + 1, episodes + 1):
+            start = time.perf_counter()
+            result = run_episode(env, q_table, epsilon, rng, replay, VISUAL_TRAINING)
+            if result is None:
+                # The window was closed: save on exit and quit
+                checkpoints.save(saved_q_table, epsilon, episode - 1, rngs)
+                pygame.quit()
+                sys.exit()
+            total_reward, steps = result
+            steps_per_sec = steps / (time.perf_counter() - start)
+            epsilon = decay_epsilon(epsilon)
+
+            metrics.record(
+                episode,
+                total_reward,
+                steps,
+                env.final_score,
+                env.final_phase,
+                epsilon,
+                steps_per_sec,
+            )
+            if episode % PRINT_INTERVAL == 0:
+                print(
+                    f"Episode: {episode}, Total Reward: {total_reward:.2f}, Epsilon: {epsilon:.4f}, "
+                    f"Steps/sec: {steps_per_sec:,.0f}"
+                )
+
+            if PROFILE and episode % PROFILE_INTERVAL == 0:
+                print(
+                    f"--- step() profile, episodes {episode - PROFILE_INTERVAL + 1}-{episode} ---"
+                )
+                print(profiler.report())
+                profiler.reset()
+
+            # Periodically checkpoint the training state without waiting for the write
+            if episode % SAVE_INTERVAL == 0:
+                checkpoints.save(saved_q_table, epsilon, episode, rngs)
+                print(f"--- Training data saved at episode {episode} ---")
+
+        print("Training finished.")
+        # Final save
+        checkpoints.save(saved_q_table, epsilon, episodes, rngs)
+    finally:
+        # Also on exit and on Ctrl-C, the only way to stop a headless run: write the buffered
+        # metrics, the profile and every queued checkpoint
+        metrics.flush()
+        if stats is not None:
+            stats.disable()
+            stats.dump_stats(PROFILE_STATS_FILE)
+            print(f"cProfile stats written to {PROFILE_STATS_FILE}")
+        checkpoints.close()
+
+
+if __name__ == "__main__":
+    train()
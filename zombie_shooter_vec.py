@@ -0,0 +1,321 @@
+"""
+Vectorized version of the zombie shooter RL environment that steps N independent games at once.
+
+Instead of one pygame.Rect per entity, the player, zombie and bullet positions of all games are kept in NumPy arrays
+with a fixed number of zombie and bullet slots per game. Movement, spawning, collision checks and the get_state()
+discretization are done with array operations over every game at once, and step() takes a vector of actions.
+
+The reward rules and the (player_pos, health, phase, zombie_dir) state are the same as in zombie_shooter_with_rl.py,
+so the same (5, 4, 3, 9, 9) Q-table can be trained and used with either environment. Positions are floats, as in
+the single-game environment's entity pools. The differences from the single-game environment are:
+    - A spawn (or shot) is skipped when all zombie (or bullet) slots of a game are in use.
+    - A bullet can only hit the first zombie it overlaps; if that zombie is also hit by another bullet in the same
+      frame the extra bullet keeps flying instead of trying the next zombie.
+
+Run this file directly to measure the throughput in environment steps per second.
+"""
+
+import time
+import numpy as np
+from state_encoding import (
+    ENCODERS,
+    DEFAULT_ENCODER,
+    flat_states,
+    nearest_directions,
+    wall_states,
+)
+from zombie_shooter_with_rl import (
+    WIDTH,
+    HEIGHT,
+    PLAYER_SPEED,
+    BULLET_SPEED,
+    PLAYER_HEALTH,
+    PHASES,
+)
+
+# Per-phase values looked up by each game's phase index
+PHASE_TIME_FRAMES = np.array([p["time_frames"] for p in PHASES])
+PHASE_SPAWN_DELAY_FRAMES = np.array([p["spawn_delay_frames"] for p in PHASES])
+PHASE_ZOMBIE_SPEED = np.array([p["zombie_speed"] for p in PHASES], dtype=np.float64)
+
+# Bullet direction for every action (non-shooting actions are zero)
+ACTION_BULLET_DX = np.array([0, 0, 0, 0, 0, 0, 0, -1, 1])
+ACTION_BULLET_DY = np.array([0, 0, 0, 0, 0, -1, 1, 0, 0])
+
+
+class VecZombieShooterEnv:
+    """
+    N independent zombie shooter games stepped together with NumPy.
+
+    Parameters
+    ----------
+    num_envs : int
+        Number of games to run in parallel.
+    max_zombies : int
+        Number of zombie slots per game.
+    max_bullets : int
+        Number of bullet slots per game.
+    seed : int or None
+        Seed for the random number generator used for spawning.
+    state_encoder : str
+        Encoder for the nearest-zombie direction, "atan2" or "octant" (see state_encoding.py).
+    flat_state : bool
+        If True, get_state() returns an (N,) array of flat state indices into a (540, 9)
+        Q-table instead of an (N, 4) array.
+    """
+
+    def __init__(
+        self,
+        num_envs,
+        max_zombies=32,
+        max_bullets=64,
+        seed=None,
+        state_encoder=DEFAULT_ENCODER,
+        flat_state=False,
+    ):
+        if state_encoder not in ENCODERS:
+            raise ValueError(f"Unknown state encoder: {state_encoder!r}")
+        self.num_envs = num_envs
+        self.max_zombies = max_zombies
+        self.max_bullets = max_bullets
+        self.rng = np.random.default_rng(seed)
+        self.state_encoder = state_encoder
+        self.flat_state = flat_state
+
+        n = num_envs
+        self.frame_count = np.zeros(n, dtype=np.int64)
+        self.player_x = np.zeros(n)
+        self.player_y = np.zeros(n)
+        self.health = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.phase = np.zeros(n, dtype=np.int64)
+        self.phase_start = np.zeros(n, dtype=np.int64)
+        self.last_spawn = np.zeros(n, dtype=np.int64)
+        self.final_score = np.zeros(
+            n, dtype=np.int64
+        )  # Score of each game's last finished episode
+
+        self.zombie_x = np.zeros((n, max_zombies))
+        self.zombie_y = np.zeros((n, max_zombies))
+        self.zombie_alive = np.zeros((n, max_zombies), dtype=bool)
+
+        self.bullet_x = np.zeros((n, max_bullets))
+        self.bullet_y = np.zeros((n, max_bullets))
+        self.bullet_dx = np.zeros((n, max_bullets))
+        self.bullet_dy = np.zeros((n, max_bullets))
+        self.bullet_alive = np.zeros((n, max_bullets), dtype=bool)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Resets the games selected by the boolean mask (all games if None) and returns the states of all games.
+        """
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        self.player_x[mask] = WIDTH // 2 - 20
+        self.player_y[mask] = HEIGHT // 2 - 20
+        self.health[mask] = PLAYER_HEALTH
+        self.score[mask] = 0
+        self.phase[mask] = 0
+        self.phase_start[mask] = self.frame_count[mask]
+        self.last_spawn[mask] = self.frame_count[mask]
+        self.zombie_alive[mask] = False
+        self.bullet_alive[mask] = False
+        return self.get_state()
+
+    def get_state(self):
+        """
+        Returns the states of all games as an (N, 4) integer array.
+
+        Each row is the (player_pos, health, phase, zombie_dir) tuple described in
+        ZombieShooterEnv.get_state(), so q_table[tuple(states.T)] gives the (N, 9) Q-values.
+        With flat_state=True the rows' flat indices are returned instead, for a (540, 9) table.
+        """
+        px = self.player_x
+        py = self.player_y
+
+        # 1. Player position (near wall or not)
+        player_pos_state = wall_states(px, py, WIDTH, HEIGHT)
+
+        # 4. Nearest zombie relative direction (0 when there is no zombie)
+        zombie_dir_state = nearest_directions(
+            self.zombie_x - px[:, None],
+            self.zombie_y - py[:, None],
+            self.zombie_alive,
+            self.state_encoder,
+        )
+
+        states = np.stack(
+            [player_pos_state, self.health, self.phase, zombie_dir_state], axis=1
+        )
+        return flat_states(states) if self.flat_state else states
+
+    def step(self, actions):
+        """
+        Applies one action per game and advances every game by one frame.
+
+        Parameters
+        ----------
+        actions : array of int, shape (N,)
+            Actions in the range [0, 8] with the same meaning as ZombieShooterEnv.step().
+
+        Returns
+        -------
+        tuple
+            (next states (N, 4), rewards (N,), dones (N,)). Games that finish are reset
+            straight away, so the returned state of a finished game is its new initial state.
+        """
+        actions = np.asarray(actions)
+        self.frame_count += 1
+        reward = np.full(self.num_envs, 0.1)  # Small reward for staying alive
+
+        # Handle movement actions (1-4), keeping the player on screen
+        px = self.player_x
+        py = self.player_y
+        py -= np.where((actions == 1) & (py > 0), PLAYER_SPEED, 0)
+        py += np.where((actions == 2) & (py + 40 < HEIGHT), PLAYER_SPEED, 0)
+        px -= np.where((actions == 3) & (px > 0), PLAYER_SPEED, 0)
+        px += np.where((actions == 4) & (px + 40 < WIDTH), PLAYER_SPEED, 0)
+
+        # Handle shooting actions (5-8)
+        shooting = actions >= 5
+        reward -= np.where(shooting, 0.1, 0.0)  # Small penalty for shooting
+        rows, slots = self._claim_slots(self.bullet_alive, shooting)
+        # Centred on the player, as in ZombieShooterEnv.fire()
+        self.bullet_x[rows, slots] = px[rows] + 17.5
+        self.bullet_y[rows, slots] = py[rows] + 15
+        self.bullet_dx[rows, slots] = ACTION_BULLET_DX[actions[rows]]
+        self.bullet_dy[rows, slots] = ACTION_BULLET_DY[actions[rows]]
+
+        # Update phase
+        next_phase = (self.phase < len(PHASES) - 1) & (
+            self.frame_count - self.phase_start > PHASE_TIME_FRAMES[self.phase]
+        )
+        self.phase += next_phase
+        self.phase_start[next_phase] = self.frame_count[next_phase]
+        self.last_spawn[next_phase] = self.frame_count[next_phase]
+        reward += np.where(next_phase, 5.0, 0.0)  # Reward for reaching new phase
+
+        # Spawn zombies at a random position on a random edge
+        spawning = (
+            self.frame_count - self.last_spawn > PHASE_SPAWN_DELAY_FRAMES[self.phase]
+        )
+        self.last_spawn[spawning] = self.frame_count[spawning]
+        rows, slots = self._claim_slots(self.zombie_alive, spawning)
+        count = len(rows)
+        edge = self.rng.integers(0, 4, size=count)  # top, bottom, left, right
+        along_x = self.rng.integers(0, WIDTH - 40, size=count, endpoint=True)
+        along_y = self.rng.integers(0, HEIGHT - 40, size=count, endpoint=True)
+        self.zombie_x[rows, slots] = np.select(
+            [edge < 2, edge == 2], [along_x, 0], default=WIDTH - 40
+        )
+        self.zombie_y[rows, slots] = np.select(
+            [edge == 0, edge == 1, edge >= 2], [0, HEIGHT - 40, along_y]
+        )
+
+        # Slots are always claimed lowest-first, so only the slots up to the highest
+        # one in use in any game need to be moved and checked for collisions
+        nz = _used_slots(self.zombie_alive)
+        nb = _used_slots(self.bullet_alive)
+        zombie_alive = self.zombie_alive[:, :nz]
+        bullet_alive = self.bullet_alive[:, :nb]
+
+        # Move zombies towards the player
+        zx = self.zombie_x[:, :nz]
+        zy = self.zombie_y[:, :nz]
+        dx = px[:, None] - zx
+        dy = py[:, None] - zy
+        dist = np.sqrt(dx * dx + dy * dy)
+        speed = PHASE_ZOMBIE_SPEED[self.phase][:, None] / np.where(dist > 0, dist, 1)
+        zx += dx * speed
+        zy += dy * speed
+        zombie_alive &= (-40 <= zx) & (zx <= WIDTH) & (-40 <= zy) & (zy <= HEIGHT)
+
+        # Move bullets
+        bx = self.bullet_x[:, :nb]
+        by = self.bullet_y[:, :nb]
+        bx += self.bullet_dx[:, :nb] * BULLET_SPEED
+        by += self.bullet_dy[:, :nb] * BULLET_SPEED
+        bullet_alive &= (0 <= bx) & (bx <= WIDTH) & (0 <= by) & (by <= HEIGHT)
+
+        # Check bullet (5x10) against zombie (40x40) collisions for every pair
+        hit = (
+            bullet_alive[:, :, None]
+            & zombie_alive[:, None, :]
+            & (bx[:, :, None] < zx[:, None, :] + 40)
+            & (zx[:, None, :] < bx[:, :, None] + 5)
+            & (by[:, :, None] < zy[:, None, :] + 40)
+            & (zy[:, None, :] < by[:, :, None] + 10)
+        )
+        # Only the few games with a hit are resolved: each bullet takes the first
+        # zombie it overlaps, each zombie the first bullet aimed at it
+        rows = np.flatnonzero(hit.any(axis=(1, 2)))
+        hit = hit[rows]
+        first_zombie = hit & (hit.cumsum(axis=2) == 1)
+        first_bullet = first_zombie & (first_zombie.cumsum(axis=1) == 1)
+        bullet_alive[rows] &= ~first_bullet.any(axis=2)
+        killed = first_bullet.any(axis=1)
+        zombie_alive[rows] &= ~killed
+        kills = np.zeros(self.num_envs, dtype=np.int64)
+        kills[rows] = killed.sum(axis=1)
+        self.score += kills
+        reward += 10.0 * kills  # Reward for killing zombie
+
+        # Check player (40x40) against zombie collisions
+        touching = (
+            zombie_alive
+            & (np.abs(zx - px[:, None]) < 40)
+            & (np.abs(zy - py[:, None]) < 40)
+        )
+        zombie_alive &= ~touching
+        damage = np.minimum(touching.sum(axis=1), self.health)
+        self.health -= damage
+        reward -= 20.0 * damage  # Penalty for taking damage
+
+        done = self.health <= 0
+        reward -= np.where(done, 50.0, 0.0)  # Penalty for dying
+        if done.any():
+            self.final_score[done] = self.score[done]
+            self.reset(done)
+
+        return self.get_state(), reward, done
+
+    def _claim_slots(self, alive, wanted):
+        """
+        Marks one free slot as alive in every row of `alive` where `wanted` is True.
+
+        Returns the (rows, slots) index arrays of the claimed slots; rows without a free slot are left out.
+        """
+        free = ~alive
+        rows = np.flatnonzero(wanted & free.any(axis=1))
+        slots = free[rows].argmax(axis=1)
+        alive[rows, slots] = True
+        return rows, slots
+
+
+def _used_slots(alive):
+    """Returns one past the highest slot index that is alive in any row of `alive`."""
+    used = np.flatnonzero(alive.any(axis=0))
+    return used[-1] + 1 if len(used) else 0
+
+
+def benchmark(num_envs=1024, steps=1000, seed=0):
+    """
+    Steps num_envs games with random actions and returns the throughput in environment steps per second.
+    """
+    env = VecZombieShooterEnv(num_envs, seed=seed)
+    rng = np.random.default_rng(seed)
+    actions = rng.integers(0, 9, size=(steps, num_envs))
+    start = time.perf_counter()
+    for t in range(steps):
+        env.step(actions[t])
+    elapsed = time.perf_counter() - start
+    return num_envs * steps / elapsed
+
+
+if __name__ == "__main__":
+    for n in (1, 64, 256, 1024, 4096):
+        print(
+            f"{n:5d} envs: {benchmark(num_envs=n, steps=max(200, 200000 // n)):,.0f} steps/sec"
+        )
@@ -1,15 +1,27 @@
 """
 This game environment is the enhanced version of the zombie_shooter.py incorporating the Q-learning components like state, actions and rewards to train the Q-learning model
+
+The game is wrapped in the ZombieShooterEnv class, which owns all of its state and exposes reset(), step() and
+get_state(). Nothing is drawn (and no window is opened) unless the environment is created with render=True, so the
+module can be imported on display-less machines and many independent environments can live in one process.
 """
 
+import math
+import os
 import pygame
 import sys
-import random
 import time
-import math
-
-# Start Pygame
-pygame.init()
+import numpy as np
+from entity_pool import EntityPool, SMALL_POOL
+from state_encoding import (
+    DIRECTION,
+    ENCODERS,
+    DEFAULT_ENCODER,
+    flat_state,
+    nearest_direction,
+    nearest_directions,
+    wall_states,
+)
 
 # Game settings
 WIDTH = 800
@@ -24,6 +36,9 @@ GREEN = (0, 255, 0)
 CYAN = (0, 255, 255)
 BLACK = (50, 50, 50)
 DOUBLE_TAP_TIME = 0.3
+MAX_ZOMBIES = 256  # Zombie slots per game; spawns are skipped while all are in use
+MAX_BULLETS = 256  # Bullet slots per game; shots are skipped while all are in use
+SCREEN_BOUNDS = ((0, 0), (WIDTH, HEIGHT))  # Bullets leaving this box are dropped
 
 # Game phases
 PHASES = [
@@ -32,421 +47,706 @@ PHASES = [
     {"name": "Phase 3", "spawn_delay": 500, "zombie_speed": 4, "time": 999999},
 ]
 
-# Set up the screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Zombie Shooter")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont("monospace", 30)
-
-# Create images
-background = pygame.Surface((WIDTH, HEIGHT))
-background.fill(BLACK)
-player_img = pygame.Surface((40, 40))
-player_img.fill(GREEN)
-zombie_img = pygame.Surface((40, 40))
-zombie_img.fill(RED)
-bullet_img = pygame.Surface((5, 10))
-bullet_img.fill(WHITE)
-arrow_img = pygame.Surface((20, 20), pygame.SRCALPHA)
-pygame.draw.polygon(arrow_img, CYAN, [(10, 0), (5, 15), (15, 15)])
-
-# Game variables
-player = pygame.Rect(WIDTH // 2 - 20, HEIGHT // 2 - 20, 40, 40)
-bullets = []  # List of (rect, direction)
-zombies = []
-score = 0
-health = PLAYER_HEALTH
-phase = 0
-phase_start = time.time()
-last_spawn = pygame.time.get_ticks()
-aim_direction = (0, -1)  # Up by default
-game_over = False
-last_key_time = 0
-last_key = None
-
-
-def reset_game():
-    """
-    Resets the game to its initial state.
+# The game runs on a simulated clock that advances one frame per update, so
+# phase durations (seconds) and spawn delays (milliseconds) are counted in frames
+# at FPS. This keeps the dynamics identical at any stepping speed.
+for _phase in PHASES:
+    _phase["time_frames"] = _phase["time"] * FPS
+    _phase["spawn_delay_frames"] = _phase["spawn_delay"] * FPS // 1000
 
-    This function reinitializes key game variables to their starting values,
-    positioning the player at the center of the screen, clearing bullets and
-    zombies, resetting health, score, and phase, and setting the game_over flag
-    to False. It also records the current time for phase management and updates
-    the time of the last zombie spawn.
-    """
-    global player, bullets, zombies, health, game_over, last_spawn, score, phase, phase_start, aim_direction
-    player = pygame.Rect(WIDTH // 2 - 20, HEIGHT // 2 - 20, 40, 40)
-    bullets = []
-    zombies = []
-    health = PLAYER_HEALTH
-    score = 0
-    phase = 0
-    phase_start = time.time()
-    last_spawn = pygame.time.get_ticks()
-    game_over = False
-    aim_direction = (0, -1)
-
-
-def get_state():
-    """
-    Returns the current state of the game as a tuple representing:
-    1. Player's position relative to the walls (0: not near, 1: near top, 2: near bottom, 3: near left, 4: near right).
-    2. Player's health as an integer.
-    3. Current game phase as an integer.
-    4. Direction of the nearest zombie relative to the player (0: no zombie, 1: up, 2: up-right, 3: right, 4: down-right,
-       5: down, 6: down-left, 7: left, 8: up-left).
-
-    The state provides a simplified representation of the game's condition used for decision-making
-    in reinforcement learning.
-    """
-    # 1. Player position (near wall or not)
-    player_pos_state = 0
-    if player.top < 50:
-        player_pos_state = 1  # Near Top
-    elif player.bottom > HEIGHT - 50:
-        player_pos_state = 2  # Near Bottom
-    elif player.left < 50:
-        player_pos_state = 3  # Near Left
-    elif player.right > WIDTH - 50:
-        player_pos_state = 4  # Near Right
-
-    # 2. Health (already simple)
-    health_state = int(health)
-
-    # 3. Phase (already simple)
-    phase_state = phase
-
-    # 4. Nearest zombie relative direction
-    zombie_dir_state = 0  # Default to "no zombie"
-    if zombies:
-        closest = min(
-            zombies,
-            key=lambda z: math.hypot(
-                z.centerx - player.centerx, z.centery - player.centery
-            ),
-        )
 
-        dx = closest.centerx - player.centerx
-        dy = closest.centery - player.centery
-        angle = math.degrees(math.atan2(-dy, dx))  # Angle in degrees
-
-        if -22.5 <= angle < 22.5:
-            zombie_dir_state = 3  # Right
-        elif 22.5 <= angle < 67.5:
-            zombie_dir_state = 2  # Up-Right
-        elif 67.5 <= angle < 112.5:
-            zombie_dir_state = 1  # Up
-        elif 112.5 <= angle < 157.5:
-            zombie_dir_state = 8  # Up-Left
-        elif angle >= 157.5 or angle < -157.5:
-            zombie_dir_state = 7  # Left
-        elif -157.5 <= angle < -112.5:
-            zombie_dir_state = 6  # Down-Left
-        elif -112.5 <= angle < -67.5:
-            zombie_dir_state = 5  # Down
-        elif -67.5 <= angle < -22.5:
-            zombie_dir_state = 4  # Down-Right
-
-    return (player_pos_state, health_state, phase_state, zombie_dir_state)
-
-
-def step(action):
+class Renderer:
     """
-    Takes an action and updates the game state.
+    Draws a ZombieShooterEnv to a pygame window.
+
+    Creating a Renderer initialises pygame and opens the display, so it is only
+    constructed for environments that are actually watched.
 
-    The action is an integer in the range [0, 8):
-        0: Stay
-        1-4: Move up, down, left, right
-        5-8: Shoot up, down, left, right
+    The HUD text is rendered only when its value changes and the aim arrow is rotated once
+    for each direction. With dirty_rects=True (the default) a frame erases what the previous
+    frame drew by blitting the background back over those rectangles only, draws the new
+    frame and hands just the changed rectangles to pygame.display.update(), instead of
+    redrawing and flipping the whole window.
 
-    Returns a tuple of (next state, reward, done) where:
-        next state is a tuple of four integers representing the game state
-        reward is a float representing the reward for the action
-        done is a boolean indicating whether the game is over
+    With headless=True no window is opened: frames are drawn to an offscreen Surface
+    (screen) under the SDL dummy video driver, e.g. for pixel observations.
     """
-    global player, health, score, game_over, aim_direction, phase, phase_start, last_spawn
-    reward = 0.1  # Small reward for staying alive
-    done = False
-    if game_over:
-        reset_game()
-        reward -= 50  # Penalty for dying
-        return get_state(), reward, True
-
-    # Handle action (0: stay, 1-4: move, 5-8: shoot)
-    if action == 0:  # Stay
-        pass
-    elif action == 1 and player.top > 0:  # Up
-        player.y -= PLAYER_SPEED
-    elif action == 2 and player.bottom < HEIGHT:  # Down
-        player.y += PLAYER_SPEED
-    elif action == 3 and player.left > 0:  # Left
-        player.x -= PLAYER_SPEED
-    elif action == 4 and player.right < WIDTH:  # Right
-        player.x += PLAYER_SPEED
-    elif action == 5:  # Shoot up
-        aim_direction = (0, -1)
-        bullet = pygame.Rect(player.centerx - 2.5, player.centery - 5, 5, 10)
-        bullets.append((bullet, aim_direction))
-        reward -= 0.1  # Small penalty for shooting
-    elif action == 6:  # Shoot down
-        aim_direction = (0, 1)
-        bullet = pygame.Rect(player.centerx - 2.5, player.centery - 5, 5, 10)
-        bullets.append((bullet, aim_direction))
-        reward -= 0.1
-    elif action == 7:  # Shoot left
-        aim_direction = (-1, 0)
-        bullet = pygame.Rect(player.centerx - 2.5, player.centery - 5, 5, 10)
-        bullets.append((bullet, aim_direction))
-        reward -= 0.1
-    elif action == 8:  # Shoot right
-        aim_direction = (1, 0)
-        bullet = pygame.Rect(player.centerx - 2.5, player.centery - 5, 5, 10)
-        bullets.append((bullet, aim_direction))
-        reward -= 0.1
-
-    # Update phase
-    if phase < len(PHASES) - 1 and time.time() - phase_start > PHASES[phase]["time"]:
-        phase += 1
-        phase_start = time.time()
-        last_spawn = pygame.time.get_ticks()
-        reward += 5  # Reward for reaching new phase
-
-    # Spawn zombies
-    now = pygame.time.get_ticks()
-    if now - last_spawn > PHASES[phase]["spawn_delay"]:
-        edge = random.choice(["top", "bottom", "left", "right"])
-        if edge == "top":
-            zombie = pygame.Rect(random.randint(0, WIDTH - 40), 0, 40, 40)
-        elif edge == "bottom":
-            zombie = pygame.Rect(random.randint(0, WIDTH - 40), HEIGHT - 40, 40, 40)
-        elif edge == "left":
-            zombie = pygame.Rect(0, random.randint(0, HEIGHT - 40), 40, 40)
+
+    def __init__(self, dirty_rects=True, headless=False):
+        self.headless = headless
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.init()
+        if headless:
+            self.screen = pygame.Surface((WIDTH, HEIGHT))
         else:
-            zombie = pygame.Rect(WIDTH - 40, random.randint(0, HEIGHT - 40), 40, 40)
-        zombies.append(zombie)
-        last_spawn = now
-
-    # Move zombies
-    zombie_speed = PHASES[phase]["zombie_speed"]
-    for zombie in zombies[:]:
-        dx = player.centerx - zombie.centerx
-        dy = player.centery - zombie.centery
-        dist = (dx**2 + dy**2) ** 0.5
-        if dist > 0:
-            zombie.x += (dx / dist) * zombie_speed
-            zombie.y += (dy / dist) * zombie_speed
-        if not (-40 <= zombie.x <= WIDTH and -40 <= zombie.y <= HEIGHT):
-            zombies.remove(zombie)
-
-    # Move bullets
-    for bullet, direction in bullets[:]:
-        bullet.x += direction[0] * BULLET_SPEED
-        bullet.y += direction[1] * BULLET_SPEED
-        if not (0 <= bullet.x <= WIDTH and 0 <= bullet.y <= HEIGHT):
-            bullets.remove((bullet, direction))
-
-    # Check collisions
-    for bullet, _ in bullets[:]:
-        for zombie in zombies[:]:
-            if bullet.colliderect(zombie):
-                bullets.remove((bullet, _))
-                zombies.remove(zombie)
-                score += 1
-                reward += 10  # Reward for killing zombie
-                break
-    for zombie in zombies[:]:
-        if player.colliderect(zombie):
-            zombies.remove(zombie)
-            health -= 1
-            reward -= 20  # Penalty for taking damage
-            if health <= 0:
-                game_over = True
-                reward -= 50  # Penalty for dying
-                reset_game()
-                return get_state(), reward, True
+            self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
+            pygame.display.set_caption("Zombie Shooter")
+        self.clock = pygame.time.Clock()
+        self.font = pygame.font.SysFont("monospace", 30)
+        self.dirty_rects = dirty_rects
+
+        # Create images
+        self.background = pygame.Surface((WIDTH, HEIGHT))
+        self.background.fill(BLACK)
+        self.player_img = pygame.Surface((40, 40))
+        self.player_img.fill(GREEN)
+        self.zombie_img = pygame.Surface((40, 40))
+        self.zombie_img.fill(RED)
+        self.bullet_img = pygame.Surface((5, 10))
+        self.bullet_img.fill(WHITE)
+        self.arrow_img = pygame.Surface((20, 20), pygame.SRCALPHA)
+        pygame.draw.polygon(self.arrow_img, CYAN, [(10, 0), (5, 15), (15, 15)])
+        # The aim arrow pre-rotated for every aim direction
+        self.arrow_imgs = {
+            direction: pygame.transform.rotate(self.arrow_img, angle)
+            for direction, angle in {
+                (0, -1): 0,
+                (0, 1): 180,
+                (-1, 0): 90,
+                (1, 0): -90,
+            }.items()
+        }
+
+        self.text_cache = {}  # HUD line -> (text, rendered surface)
+        self.drawn = []  # Rectangles drawn by the previous frame
+        self.full_redraw = True  # Repaint the whole window on the next frame
+
+    def text(self, line, text):
+        """Returns the rendered surface of a HUD line, rendering it again only when its text changed."""
+        cached = self.text_cache.get(line)
+        if cached is None or cached[0] != text:
+            cached = self.text_cache[line] = (text, self.font.render(text, True, WHITE))
+        return cached[1]
+
+    def draw(self, env):
+        """
+        Draws the current game state of env to the screen.
+
+        This function draws the player, zombies, bullets, aim arrow, and text
+        elements such as health, score, and phase. If the game is over, it also
+        renders a game over message and waits for 2 seconds before exiting.
+        """
+        screen = self.screen
+        background = self.background
+        full_redraw = self.full_redraw or not self.dirty_rects
+        if full_redraw:
+            screen.blit(background, (0, 0))
+        else:
+            # Erase the previous frame's sprites and text
+            for rect in self.drawn:
+                screen.blit(background, rect, rect)
+        erased = self.drawn
+
+        blit = screen.blit
+        drawn = [blit(self.player_img, env.player)]
+        for pool, image in (
+            (env.zombies, self.zombie_img),
+            (env.bullets, self.bullet_img),
+        ):
+            live = pool.live_slots()
+            for x, y in zip(pool.x[live].tolist(), pool.y[live].tolist()):
+                drawn.append(blit(image, (x, y)))
+        arrow = self.arrow_imgs[env.aim_direction]
+        drawn.append(
+            blit(
+                arrow, arrow.get_rect(center=(env.player.centerx, env.player.top - 15))
+            )
+        )
+        drawn.append(blit(self.text("health", f"Health: {env.health}"), (10, 10)))
+        drawn.append(blit(self.text("score", f"Score: {env.score}"), (10, 40)))
+        drawn.append(blit(self.text("phase", PHASES[env.phase]["name"]), (10, 70)))
+        self.drawn = drawn
+        if self.headless:
+            self.full_redraw = False
+            return
+
+        if env.game_over:
+            game_over_text = self.font.render(
+                f"Game Over! Score: {env.score}", True, WHITE
+            )
+            screen.blit(game_over_text, (WIDTH // 2 - 150, HEIGHT // 2))
+            pygame.display.flip()
+            time.sleep(2)
+            full_redraw = True
+        if full_redraw:
+            pygame.display.flip()
+            # The game over message is not tracked, so the next frame repaints everything
+            self.full_redraw = env.game_over
+        else:
+            pygame.display.update(erased + drawn)
 
-    return get_state(), reward, False
+    def tick(self, fps=FPS):
+        """Limits the frame rate to fps."""
+        self.clock.tick(fps)
 
 
-def move_player():
+class ZombieShooterEnv:
     """
-    Moves the player based on keyboard input.
-
-    This function checks the current state of keyboard keys to determine
-    the direction of player movement. The player is moved left, right, up,
-    or down by a predefined speed if the corresponding 'A', 'D', 'W', or 'S'
-    key is pressed, ensuring the player remains within the screen bounds.
+    A self-contained Zombie Shooter game used as the Q-learning environment.
+
+    Parameters
+    ----------
+    render : bool
+        If True, a Renderer is created and render() draws the game to a window.
+        If False, no display is initialised at all.
+    state_encoder : str
+        Encoder for the nearest-zombie direction, "atan2" or "octant" (see state_encoding.py).
+    seed : int, numpy.random.SeedSequence or None
+        Seed of the environment's own random number generator (rng), which drives all of
+        its randomness, so the same seed and actions replay the same games.
+    flat_state : bool
+        If True, states are returned as a single integer index into a (540, 9) Q-table
+        (see state_encoding.flat_state()) instead of a tuple.
+    action_repeat : int
+        Frames every step() plays with the same action (see step()).
     """
 
-    keys = pygame.key.get_pressed()
-    if keys[pygame.K_a] and player.left > 0:
-        player.x -= PLAYER_SPEED
-    if keys[pygame.K_d] and player.right < WIDTH:
-        player.x += PLAYER_SPEED
-    if keys[pygame.K_w] and player.top > 0:
-        player.y -= PLAYER_SPEED
-    if keys[pygame.K_s] and player.bottom < HEIGHT:
-        player.y += PLAYER_SPEED
-
+    def __init__(
+        self,
+        render=False,
+        state_encoder=DEFAULT_ENCODER,
+        seed=None,
+        flat_state=False,
+        action_repeat=1,
+    ):
+        if state_encoder not in ENCODERS:
+            raise ValueError(f"Unknown state encoder: {state_encoder!r}")
+        self.renderer = Renderer() if render else None
+        self.state_encoder = state_encoder
+        self.rng = np.random.default_rng(seed)
+        self.flat_state = flat_state
+        if action_repeat < 1:
+            raise ValueError(f"action_repeat must be at least 1, got {action_repeat}")
+        self.action_repeat = action_repeat
+        self.zombies = EntityPool(MAX_ZOMBIES, 40, 40)
+        self.bullets = EntityPool(MAX_BULLETS, 5, 10, SCREEN_BOUNDS)
+        self.frame_count = 0  # Simulated clock: frames the game has been updated for
+        self.last_key_time = 0
+        self.last_key = None
+        self.final_score = 0  # Score of the last finished game
+        self.final_phase = 0  # Phase reached in the last finished game
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the game to its initial state and returns the initial state.
+
+        This function reinitializes key game variables to their starting values,
+        positioning the player at the center of the screen, clearing bullets and
+        zombies, resetting health, score, and phase, and setting the game_over flag
+        to False. It also records the current simulated frame as the start of the
+        phase and as the time of the last zombie spawn.
+        """
+        self.player = pygame.Rect(WIDTH // 2 - 20, HEIGHT // 2 - 20, 40, 40)
+        self.bullets.clear()
+        self.zombies.clear()
+        self.health = PLAYER_HEALTH
+        self.score = 0
+        self.phase = 0
+        self.phase_start = self.frame_count  # Frame at which the current phase started
+        self.last_spawn = self.frame_count  # Frame of the last zombie spawn
+        self.game_over = False
+        self.aim_direction = (0, -1)  # Up by default
+        return self.get_state()
+
+    def clone_state(self):
+        """
+        Returns a snapshot of the complete game state for restore_state().
+
+        The snapshot holds copies of the live zombie and bullet slots, the player, health, score,
+        phase, the simulated-clock timers and the state of rng, so restoring it and taking the same
+        actions replays the game exactly. It is a tuple of plain values and small NumPy arrays that
+        can be kept, copied and pickled (e.g. to reproduce a bug mid-episode), and it can be restored
+        any number of times, also into another environment.
+        """
+        player = self.player
+        return (
+            self.zombies.snapshot(),
+            self.bullets.snapshot(),
+            (
+                player.x,
+                player.y,
+                self.health,
+                self.score,
+                self.phase,
+                self.phase_start,
+                self.last_spawn,
+                self.frame_count,
+                self.game_over,
+                self.aim_direction,
+                self.last_key_time,
+                self.last_key,
+                self.final_score,
+                self.final_phase,
+            ),
+            self.rng.bit_generator.state,
+        )
 
-def handle_input():
-    """
-    Handles player input and updates game state accordingly.
-
-    This function processes events from the Pygame event queue. If the quit event
-    is detected, it terminates the game. For keydown events, it manages player
-    actions such as aiming and shooting. The arrow keys set the aim direction,
-    shown by a cyan arrow. Double-tapping an arrow key within a defined time
-    interval fires a bullet in the current aim direction. It updates the last
-    key pressed and the time of the key press to handle double-tap shooting.
-    """
+    def restore_state(self, snapshot):
+        """Puts the game back into the state captured by clone_state()."""
+        zombies, bullets, values, rng_state = snapshot
+        self.zombies.restore(zombies)
+        self.bullets.restore(bullets)
+        (
+            self.player.x,
+            self.player.y,
+            self.health,
+            self.score,
+            self.phase,
+            self.phase_start,
+            self.last_spawn,
+            self.frame_count,
+            self.game_over,
+            self.aim_direction,
+            self.last_key_time,
+            self.last_key,
+            self.final_score,
+            self.final_phase,
+        ) = values
+        self.rng.bit_generator.state = rng_state
+
+    def get_state(self):
+        """
+        Returns the current state of the game as a tuple representing:
+        1. Player's position relative to the walls (0: not near, 1: near top, 2: near bottom, 3: near left, 4: near right).
+        2. Player's health as an integer.
+        3. Current game phase as an integer.
+        4. Direction of the nearest zombie relative to the player (0: no zombie, 1: up, 2: up-right, 3: right, 4: down-right,
+           5: down, 6: down-left, 7: left, 8: up-left).
+
+        The state provides a simplified representation of the game's condition used for decision-making
+        in reinforcement learning. Environments created with flat_state=True return the tuple's flat
+        integer index instead.
+        """
+        player = self.player
+
+        # 1. Player position (near wall or not)
+        player_pos_state = 0
+        if player.top < 50:
+            player_pos_state = 1  # Near Top
+        elif player.bottom > HEIGHT - 50:
+            player_pos_state = 2  # Near Bottom
+        elif player.left < 50:
+            player_pos_state = 3  # Near Left
+        elif player.right > WIDTH - 50:
+            player_pos_state = 4  # Near Right
+
+        # 2. Health (already simple)
+        health_state = int(self.health)
+
+        # 3. Phase (already simple)
+        phase_state = self.phase
+
+        # 4. Nearest zombie relative direction (0: no zombie)
+        zombies = self.zombies
+        zombie_dir_state = 0
+        if zombies.count:
+            n = zombies.high
+            if n <= SMALL_POOL:
+                # Same search as nearest_direction(), on Python floats; freed slots are NaN
+                px, py = player.x, player.y
+                coords = zombies.flat_pos[: n * 2].tolist()
+                best = math.inf
+                for i in range(0, n * 2, 2):
+                    x = coords[i] - px
+                    y = coords[i + 1] - py
+                    dist = math.hypot(x, y)
+                    if dist < best:
+                        best = dist
+                        dx, dy = x, y
+                zombie_dir_state = DIRECTION[self.state_encoder](dx, dy)
+            else:
+                zombie_dir_state = nearest_direction(
+                    zombies.x[:n] - player.x,
+                    zombies.y[:n] - player.y,
+                    # Freed slots are reused lowest-first, so usually none are dead
+                    None if zombies.count == n else zombies.alive[:n],
+                    self.state_encoder,
+                )
+
+        if self.flat_state:
+            return flat_state(
+                player_pos_state, health_state, phase_state, zombie_dir_state
+            )
+        return (player_pos_state, health_state, phase_state, zombie_dir_state)
+
+    def step(self, action):
+        """
+        Takes an action and updates the game state.
+
+        The action is an integer in the range [0, 8):
+            0: Stay
+            1-4: Move up, down, left, right
+            5-8: Shoot up, down, left, right
+
+        Returns a tuple of (next state, reward, done) where:
+            next state is a tuple of four integers representing the game state
+            reward is a float representing the reward for the action
+            done is a boolean indicating whether the game is over
+
+        When done is True the game has already been reset; its score and phase are kept in
+        final_score and final_phase.
+
+        The action is played for action_repeat frames and the reward is the sum of their
+        rewards, so a step costs one decision and one get_state() however many frames it
+        covers. The repeat stops early after a frame that ends the game or starts a new phase.
+        """
+        reward, done, new_phase = self.advance(action)
+        for _ in range(self.action_repeat - 1):
+            if done or new_phase:
+                break
+            frame_reward, done, new_phase = self.advance(action)
+            reward += frame_reward
+        return self.get_state(), reward, done
+
+    def advance(self, action):
+        """
+        Plays one frame of the action without computing the state.
+
+        Returns a tuple of (reward, done, new_phase), where new_phase tells whether the frame
+        started a new phase.
+        """
+        self.frame_count += 1  # Advance the simulated clock by one frame
+        reward = 0.1  # Small reward for staying alive
+        if self.game_over:
+            self.final_score = self.score
+            self.final_phase = self.phase
+            self.reset()
+            reward -= 50  # Penalty for dying
+            return reward, True, False
+
+        reward += self.apply_action(action)
+
+        # Update phase
+        new_phase = self.update_phase()
+        if new_phase:
+            reward += 5  # Reward for reaching new phase
+
+        self.spawn_zombie()
+        self.move_zombies()
+        self.move_bullets()
+
+        # Check collisions
+        kills = self.check_bullet_hits()
+        self.score += kills
+        reward += 10 * kills  # Reward for killing zombie
+        reward -= 20 * self.check_player_hits()  # Penalty for taking damage
+        if self.health <= 0:
+            self.game_over = True
+            reward -= 50  # Penalty for dying
+            self.final_score = self.score
+            self.final_phase = self.phase
+            self.reset()
+            return reward, True, new_phase
+
+        return reward, False, new_phase
+
+    def apply_action(self, action):
+        """Moves the player or fires a bullet for one step() action and returns the action's reward."""
+        reward = 0
+        player = self.player
+
+        # Handle action (0: stay, 1-4: move, 5-8: shoot)
+        if action == 0:  # Stay
+            pass
+        elif action == 1 and player.top > 0:  # Up
+            player.y -= PLAYER_SPEED
+        elif action == 2 and player.bottom < HEIGHT:  # Down
+            player.y += PLAYER_SPEED
+        elif action == 3 and player.left > 0:  # Left
+            player.x -= PLAYER_SPEED
+        elif action == 4 and player.right < WIDTH:  # Right
+            player.x += PLAYER_SPEED
+        elif action == 5:  # Shoot up
+            self.aim_direction = (0, -1)
+            self.fire()
+            reward = -0.1  # Small penalty for shooting
+        elif action == 6:  # Shoot down
+            self.aim_direction = (0, 1)
+            self.fire()
+            reward = -0.1
+        elif action == 7:  # Shoot left
+            self.aim_direction = (-1, 0)
+            self.fire()
+            reward = -0.1
+        elif action == 8:  # Shoot right
+            self.aim_direction = (1, 0)
+            self.fire()
+            reward = -0.1
+        return reward
+
+    def fire(self):
+        """Fires a bullet from the player's centre in the current aim direction."""
+        self.bullets.spawn(
+            self.player.centerx - 2.5,
+            self.player.centery - 5,
+            self.aim_direction[0] * BULLET_SPEED,
+            self.aim_direction[1] * BULLET_SPEED,
+        )
 
-    global aim_direction, last_key, last_key_time, bullets, game_over
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        if event.type == pygame.KEYDOWN and not game_over:
-            if event.key in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT):
-                current_time = time.time()
-                if (
-                    last_key == event.key
-                    and current_time - last_key_time <= DOUBLE_TAP_TIME
+    def update_phase(self):
+        """
+        Advances to the next phase once the current one has lasted its number of frames.
+
+        Returns True if the phase changed on this frame.
+        """
+        if (
+            self.phase < len(PHASES) - 1
+            and self.frame_count - self.phase_start > PHASES[self.phase]["time_frames"]
+        ):
+            self.phase += 1
+            self.phase_start = self.frame_count
+            self.last_spawn = self.frame_count
+            return True
+        return False
+
+    def spawn_zombie(self):
+        """Spawns a zombie at a random edge once the phase's spawn delay has elapsed."""
+        if (
+            self.frame_count - self.last_spawn
+            > PHASES[self.phase]["spawn_delay_frames"]
+        ):
+            rng = self.rng
+            edge = rng.integers(4)  # top, bottom, left, right
+            if edge == 0:
+                self.zombies.spawn(rng.integers(WIDTH - 40, endpoint=True), 0)
+            elif edge == 1:
+                self.zombies.spawn(rng.integers(WIDTH - 40, endpoint=True), HEIGHT - 40)
+            elif edge == 2:
+                self.zombies.spawn(0, rng.integers(HEIGHT - 40, endpoint=True))
+            else:
+                self.zombies.spawn(WIDTH - 40, rng.integers(HEIGHT - 40, endpoint=True))
+            self.last_spawn = self.frame_count
+
+    def move_entities(self):
+        """Moves zombies towards the player and bullets along their direction, dropping bullets off screen."""
+        self.move_zombies()
+        self.move_bullets()
+
+    def move_zombies(self):
+        """Moves every zombie towards the player at the current phase's speed."""
+        zombies = self.zombies
+        n = zombies.high
+        speed = PHASES[self.phase]["zombie_speed"]
+        if n <= SMALL_POOL:
+            if n:
+                # Same arithmetic as below, on Python floats. Zombie velocities are
+                # worked out afresh every frame, so only the positions are stored
+                px, py = self.player.x, self.player.y
+                coords = zombies.flat_pos[: n * 2].tolist()
+                for i in range(0, n * 2, 2):
+                    dx = px - coords[i]
+                    dy = py - coords[i + 1]
+                    scale = speed / max(math.hypot(dx, dy), 1e-9)
+                    coords[i] += dx * scale
+                    coords[i + 1] += dy * scale
+                zombies.flat_pos[: n * 2] = coords
+        else:
+            # Point every zombie's velocity at the player (top-left corners, as both are 40x40)
+            vel = zombies.vel[:n]
+            scale = zombies.scratch[:n]
+            np.subtract((self.player.x, self.player.y), zombies.pos[:n], out=vel)
+            np.hypot(vel[:, 0], vel[:, 1], out=scale)
+            # A zombie on top of the player stays put
+            np.maximum(scale, 1e-9, out=scale)
+            np.divide(speed, scale, out=scale)
+            vel *= scale[:, None]
+            zombies.move()
+        # Zombies spawn on screen and only ever move towards the on-screen
+        # player, so unlike bullets they can never leave the screen
+
+    def move_bullets(self):
+        """Moves every bullet along its direction, dropping those that leave the screen."""
+        self.bullets.move()
+
+    def check_bullet_hits(self):
+        """
+        Removes every bullet that hits a zombie together with the zombie it hit.
+
+        Bullets are checked in slot order and each takes the lowest-slot zombie it overlaps that
+        has not been hit yet. The overlapping pairs come from EntityPool.overlaps(), which loops
+        over a few entities in Python and tests every bullet-zombie pair at once with array
+        operations when the screen is crowded.
+
+        Returns the number of zombies killed.
+        """
+        bullets = self.bullets
+        zombies = self.zombies
+        if not bullets.count or not zombies.count:
+            return 0
+        hit_bullets = []
+        hit_zombies = []
+        for b, zombie_slots in bullets.overlaps(zombies):
+            for z in zombie_slots:
+                if z not in hit_zombies:
+                    hit_zombies.append(z)
+                    hit_bullets.append(b)
+                    break
+
+        if hit_bullets:
+            bullets.kill(hit_bullets)
+            zombies.kill(hit_zombies)
+        return len(hit_bullets)
+
+    def check_player_hits(self):
+        """
+        Removes the zombies touching the player and takes one health per zombie, stopping at zero health.
+
+        Returns the number of zombies that hit the player.
+        """
+        if not self.zombies.count:
+            return 0
+        player = self.player
+        slots = self.zombies.overlapping(player.x, player.y, player.w, player.h)
+        if not slots:
+            return 0
+        slots = slots[: self.health]
+        self.zombies.kill(slots)
+        self.health -= len(slots)
+        return len(slots)
+
+    def update(self):
+        """
+        Updates the game state by managing phases, spawning and moving zombies, moving bullets, and checking for collisions.
+
+        This is the human-play counterpart of step(): it progresses the game through its phases based on elapsed
+        simulated frames, spawns zombies at random edges with increasing frequency and speed as phases progress, and
+        moves existing zombies towards the player. It also handles the movement of bullets and checks for collisions
+        between bullets and zombies to update the score. Player health is reduced upon contact with zombies, leading
+        to a game over if health reaches zero.
+        """
+        self.frame_count += 1  # Advance the simulated clock by one frame
+        self.update_phase()
+        self.spawn_zombie()
+        self.move_entities()
+        self.score += self.check_bullet_hits()
+        self.check_player_hits()
+        if self.health <= 0:
+            self.game_over = True
+            self.reset()
+
+    def move_player(self, keys):
+        """
+        Moves the player based on keyboard input.
+
+        This function checks the given keyboard state (from pygame.key.get_pressed()) to determine
+        the direction of player movement. The player is moved left, right, up,
+        or down by a predefined speed if the corresponding 'A', 'D', 'W', or 'S'
+        key is pressed, ensuring the player remains within the screen bounds.
+        """
+        player = self.player
+        if keys[pygame.K_a] and player.left > 0:
+            player.x -= PLAYER_SPEED
+        if keys[pygame.K_d] and player.right < WIDTH:
+            player.x += PLAYER_SPEED
+        if keys[pygame.K_w] and player.top > 0:
+            player.y -= PLAYER_SPEED
+        if keys[pygame.K_s] and player.bottom < HEIGHT:
+            player.y += PLAYER_SPEED
+
+    def handle_input(self):
+        """
+        Handles player input and updates game state accordingly.
+
+        This function processes events from the Pygame event queue. If the quit event
+        is detected, it terminates the game. For keydown events, it manages player
+        actions such as aiming and shooting. The arrow keys set the aim direction,
+        shown by a cyan arrow. Double-tapping an arrow key within a defined time
+        interval fires a bullet in the current aim direction. It updates the last
+        key pressed and the time of the key press to handle double-tap shooting.
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN and not self.game_over:
+                if event.key in (
+                    pygame.K_UP,
+                    pygame.K_DOWN,
+                    pygame.K_LEFT,
+                    pygame.K_RIGHT,
                 ):
-                    bullet = pygame.Rect(
-                        player.centerx - 2.5, player.centery - 5, 5, 10
-                    )
-                    bullets.append((bullet, aim_direction))
-                last_key = event.key
-                last_key_time = current_time
-                if event.key == pygame.K_UP:
-                    aim_direction = (0, -1)
-                elif event.key == pygame.K_DOWN:
-                    aim_direction = (0, 1)
-                elif event.key == pygame.K_LEFT:
-                    aim_direction = (-1, 0)
-                elif event.key == pygame.K_RIGHT:
-                    aim_direction = (1, 0)
-
-
-def draw_game():
-    """
-    Draws the current game state to the screen.
-
-    This function draws the player, zombies, bullets, aim arrow, and text
-    elements such as health, score, and phase. If the game is over, it also
-    renders a game over message and waits for 2 seconds before exiting.
-    """
-    screen.blit(background, (0, 0))
-    screen.blit(player_img, player)
-    for zombie in zombies:
-        screen.blit(zombie_img, zombie)
-    for bullet, _ in bullets:
-        screen.blit(bullet_img, bullet)
-    angle = {(0, -1): 0, (0, 1): 180, (-1, 0): 90, (1, 0): -90}[aim_direction]
-    arrow_rotated = pygame.transform.rotate(arrow_img, angle)
-    arrow_rect = arrow_rotated.get_rect(center=(player.centerx, player.top - 15))
-    screen.blit(arrow_rotated, arrow_rect)
-    health_text = font.render(f"Health: {health}", True, WHITE)
-    score_text = font.render(f"Score: {score}", True, WHITE)
-    phase_text = font.render(PHASES[phase]["name"], True, WHITE)
-    screen.blit(health_text, (10, 10))
-    screen.blit(score_text, (10, 40))
-    screen.blit(phase_text, (10, 70))
-    if game_over:
-        game_over_text = font.render(f"Game Over! Score: {score}", True, WHITE)
-        screen.blit(game_over_text, (WIDTH // 2 - 150, HEIGHT // 2))
-        pygame.display.flip()
-        time.sleep(2)
-    pygame.display.flip()
-
-
-def update_game():
+                    current_time = time.time()
+                    if (
+                        self.last_key == event.key
+                        and current_time - self.last_key_time <= DOUBLE_TAP_TIME
+                    ):
+                        self.fire()
+                    self.last_key = event.key
+                    self.last_key_time = current_time
+                    if event.key == pygame.K_UP:
+                        self.aim_direction = (0, -1)
+                    elif event.key == pygame.K_DOWN:
+                        self.aim_direction = (0, 1)
+                    elif event.key == pygame.K_LEFT:
+                        self.aim_direction = (-1, 0)
+                    elif event.key == pygame.K_RIGHT:
+                        self.aim_direction = (1, 0)
+
+    def render(self):
+        """Draws the game if the environment was created with render=True."""
+        if self.renderer is not None:
+            self.renderer.draw(self)
+
+    def tick(self):
+        """
+        Limits the step rate so the game runs at FPS frames per second when rendering; a no-op
+        for headless environments.
+        """
+        if self.renderer is not None:
+            self.renderer.tick(FPS / self.action_repeat)
+
+
+def get_states(envs, state_encoder=DEFAULT_ENCODER):
     """
-    Updates the game state by managing phases, spawning and moving zombies, moving bullets, and checking for collisions.
+    Returns the get_state() tuples of several environments as an (N, 4) integer array.
 
-    This function progresses the game through its phases based on elapsed time, spawns zombies at random edges with increasing frequency and speed as phases progress, and moves existing zombies towards the player. It also handles the movement of bullets and checks for collisions between bullets and zombies to update the score. Player health is reduced upon contact with zombies, leading to a game over if health reaches zero.
+    The wall and nearest-zombie parts are computed for all environments at once on their
+    zombie arrays, padded to the largest number of zombie slots in use.
     """
-    global phase, phase_start, last_spawn, health, game_over, score
-    # Update phase
-    if phase < len(PHASES) - 1 and time.time() - phase_start > PHASES[phase]["time"]:
-        phase += 1
-        phase_start = time.time()
-        last_spawn = pygame.time.get_ticks()
-    # Spawn zombies
-    now = pygame.time.get_ticks()
-    if now - last_spawn > PHASES[phase]["spawn_delay"]:
-        edge = random.choice(["top", "bottom", "left", "right"])
-        if edge == "top":
-            zombie = pygame.Rect(random.randint(0, WIDTH - 40), 0, 40, 40)
-        elif edge == "bottom":
-            zombie = pygame.Rect(random.randint(0, WIDTH - 40), HEIGHT - 40, 40, 40)
-        elif edge == "left":
-            zombie = pygame.Rect(0, random.randint(0, HEIGHT - 40), 40, 40)
-        else:
-            zombie = pygame.Rect(WIDTH - 40, random.randint(0, HEIGHT - 40), 40, 40)
-        zombies.append(zombie)
-        last_spawn = now
-    # Move zombies
-    zombie_speed = PHASES[phase]["zombie_speed"]
-    for zombie in zombies[:]:
-        dx = player.centerx - zombie.centerx
-        dy = player.centery - zombie.centery
-        dist = (dx**2 + dy**2) ** 0.5
-        if dist > 0:
-            zombie.x += (dx / dist) * zombie_speed
-            zombie.y += (dy / dist) * zombie_speed
-        if not (-40 <= zombie.x <= WIDTH and -40 <= zombie.y <= HEIGHT):
-            zombies.remove(zombie)
-    # Move bullets
-    for bullet, direction in bullets[:]:
-        bullet.x += direction[0] * BULLET_SPEED
-        bullet.y += direction[1] * BULLET_SPEED
-        if not (0 <= bullet.x <= WIDTH and 0 <= bullet.y <= HEIGHT):
-            bullets.remove((bullet, direction))
-    # Check collisions
-    for bullet, _ in bullets[:]:
-        for zombie in zombies[:]:
-            if bullet.colliderect(zombie):
-                bullets.remove((bullet, _))
-                zombies.remove(zombie)
-                score += 1
-                break
-    for zombie in zombies[:]:
-        if player.colliderect(zombie):
-            zombies.remove(zombie)
-            health -= 1
-            if health <= 0:
-                game_over = True
-                reset_game()
-
-
-def main(human=True):
+    n = len(envs)
+    width = max((env.zombies.high for env in envs), default=0)
+    px = np.empty(n)
+    py = np.empty(n)
+    dx = np.zeros((n, width))
+    dy = np.zeros((n, width))
+    alive = np.zeros((n, width), dtype=bool)
+    states = np.empty((n, 4), dtype=np.int64)
+    for i, env in enumerate(envs):
+        zombies = env.zombies
+        used = zombies.high
+        px[i] = env.player.x
+        py[i] = env.player.y
+        dx[i, :used] = zombies.x[:used]
+        dy[i, :used] = zombies.y[:used]
+        alive[i, :used] = zombies.alive[:used]
+        states[i, 1] = env.health
+        states[i, 2] = env.phase
+    dx -= px[:, None]
+    dy -= py[:, None]
+    states[:, 0] = wall_states(px, py, WIDTH, HEIGHT)
+    states[:, 3] = nearest_directions(dx, dy, alive, state_encoder)
+    return states
+
+
+def main():
     """
-    Main game loop.
-
-    If human is True, the function calls handle_input, move_player, and update_game
-    each frame. If human is False, the function only calls draw_game, and relies on
-    external calls to step to update the game state.
+    Main game loop for a human player.
 
-    The function runs an infinite loop, calling either the above functions or
-    draw_game and clock.tick, depending on the value of human. The game loop will
+    Each frame the function handles keyboard input, moves the player, updates
+    the game and draws it, limiting the frame rate to FPS. The game loop will
     continue running until the user closes the game window, at which point the
     game will exit.
     """
-    global game_over
+    env = ZombieShooterEnv(render=True)
     while True:
-        if human:
-            handle_input()
-            move_player()
-            update_game()
-        else:
-            # For RL, step is called externally
-            pass
-        draw_game()
-        clock.tick(FPS)
+        env.handle_input()
+        env.move_player(pygame.key.get_pressed())
+        env.update()
+        env.render()
+        env.tick()
 
 
 if __name__ == "__main__":
-    main(human=True)
+    main()